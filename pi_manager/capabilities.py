@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 3600  # Seconds before cached capabilities are fetched again
+RETRY_INTERVAL = 60  # Seconds before retrying a camera whose capabilities could not be fetched
+
+# Used until a camera answers, and for values its API does not report
+DEFAULT_CAPABILITIES = {
+    "zoom": {"min": 0, "max": 64},
+    "focus": None,
+    "speed": {"min": 1, "max": 64},
+    "directions": [
+        "Up",
+        "Down",
+        "Left",
+        "Right",
+        "LeftUp",
+        "LeftDown",
+        "RightUp",
+        "RightDown",
+    ],
+    "encoding": {},
+    "abilities": [],
+}
+
+
+def clamp(value: int, value_range: dict) -> int:
+    """Clamps a value into a `{"min": ..., "max": ...}` range."""
+    return max(value_range["min"], min(value_range["max"], value))
+
+
+def _command_result(responses, cmd: str):
+    """Returns the successful result of `cmd` in a batched response, or None."""
+    for response in responses or []:
+        if response.get("cmd") == cmd and response.get("code") == 0:
+            return response
+    return None
+
+
+def parse_capabilities(responses) -> dict:
+    """Builds the capabilities of a camera from its GetAbility/GetZoomFocus/GetEnc answers."""
+    capabilities = copy.deepcopy(DEFAULT_CAPABILITIES)
+
+    ability = _command_result(responses, "GetAbility")
+    if ability:
+        channels = ability["value"]["Ability"].get("abilityChn") or [{}]
+        capabilities["abilities"] = sorted(
+            name
+            for name, value in channels[0].items()
+            if isinstance(value, dict) and value.get("ver", 0) > 0
+        )
+
+    zoom_focus = _command_result(responses, "GetZoomFocus")
+    if zoom_focus and "range" in zoom_focus:
+        ranges = zoom_focus["range"]["ZoomFocus"]
+        for key in ("zoom", "focus"):
+            if key in ranges:
+                pos = ranges[key]["pos"]
+                capabilities[key] = {"min": pos["min"], "max": pos["max"]}
+
+    enc = _command_result(responses, "GetEnc")
+    if enc and "range" in enc:
+        # One entry per supported main stream resolution
+        for option in enc["range"]["Enc"]:
+            for stream in ("mainStream", "subStream"):
+                if stream not in option:
+                    continue
+                stream_range = capabilities["encoding"].setdefault(
+                    stream, {"size": [], "bitRate": [], "frameRate": []}
+                )
+                size = option[stream].get("size")
+                if size and size not in stream_range["size"]:
+                    stream_range["size"].append(size)
+                for key in ("bitRate", "frameRate"):
+                    stream_range[key] = sorted(
+                        set(stream_range[key]) | set(option[stream].get(key, []))
+                    )
+
+    return capabilities
+
+
+class CapabilityCache:
+    """Per-camera capabilities, fetched once and refreshed every `refresh_interval` seconds."""
+
+    def __init__(
+        self,
+        refresh_interval: float = REFRESH_INTERVAL,
+        retry_interval: float = RETRY_INTERVAL,
+    ):
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self._entries = {}  # camera_id -> {"capabilities", "fetched_at", "expires_at", "source"}
+        self._locks = {}
+
+    async def get(self, camera_id: str, camera) -> dict:
+        """Returns the cached entry of a camera, fetching it first if missing or stale."""
+        entry = self._entries.get(camera_id)
+        if entry is not None and entry["expires_at"] > time.time():
+            return entry
+
+        # Only one request per camera goes out, concurrent callers wait for it
+        lock = self._locks.setdefault(camera_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(camera_id)
+            if entry is None or entry["expires_at"] <= time.time():
+                entry = await self._fetch(camera_id, camera, entry)
+                self._entries[camera_id] = entry
+        return entry
+
+    async def get_capabilities(self, camera_id: str, camera) -> dict:
+        """Shortcut returning only the capabilities dict."""
+        return (await self.get(camera_id, camera))["capabilities"]
+
+    async def _fetch(self, camera_id: str, camera, previous):
+        now = time.time()
+        try:
+            responses = await asyncio.to_thread(camera.get_capabilities)
+        except Exception as e:
+            logger.warning(f"Could not fetch capabilities of {camera_id}: {e}")
+            responses = None
+
+        if responses is None:
+            # Keep serving what we know and try again a bit later
+            capabilities = (
+                previous["capabilities"]
+                if previous
+                else copy.deepcopy(DEFAULT_CAPABILITIES)
+            )
+            return {
+                "capabilities": capabilities,
+                "fetched_at": previous["fetched_at"] if previous else None,
+                "expires_at": now + self.retry_interval,
+                "source": previous["source"] if previous else "default",
+            }
+
+        return {
+            "capabilities": parse_capabilities(responses),
+            "fetched_at": now,
+            "expires_at": now + self.refresh_interval,
+            "source": "camera",
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Segment header: magic, width, height, channels, slots, open flag, latest sequence number
+HEADER = struct.Struct("<4sIIIII Q")
+HEADER_SIZE = 64
+# Slot header: sequence number of the frame in the slot, capture timestamp
+SLOT_HEADER = struct.Struct("<Qd")
+SLOT_ALIGN = 64
+MAGIC = b"FTAP"
+
+PIX_FMT_CHANNELS = {"rgb24": 3, "bgr24": 3, "gray": 1}
+DRAIN_CHUNK = 1 << 16  # Bytes read at once from a pipe whose frames are dropped
+
+
+def shm_name(camera_id: str) -> str:
+    """Name of the shared-memory segment holding the frames of a camera."""
+    return f"frame_tap_{camera_id}"
+
+
+def _slot_stride(frame_size: int) -> int:
+    size = SLOT_HEADER.size + frame_size
+    return (size + SLOT_ALIGN - 1) // SLOT_ALIGN * SLOT_ALIGN
+
+
+class FrameTapWriter:
+    """Publishes raw frames of a live stream into a shared-memory ring buffer.
+
+    The segment holds a fixed number of fixed-size slots. Frame `seq` (starting
+    at 1) goes to slot `(seq - 1) % slots`; a slot's sequence number is cleared
+    while it is being written, so readers can tell a torn frame from a valid one.
+    """
+
+    def __init__(self, camera_id: str, width: int, height: int, pix_fmt: str, slots: int):
+        self.width = width
+        self.height = height
+        self.channels = PIX_FMT_CHANNELS[pix_fmt]
+        self.slots = slots
+        self.frame_size = width * height * self.channels
+        self.stride = _slot_stride(self.frame_size)
+        self.seq = 0
+
+        name = shm_name(camera_id)
+        size = HEADER_SIZE + slots * self.stride
+        try:
+            self.shm = SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous run that did not shut down cleanly
+            stale = SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = SharedMemory(name=name, create=True, size=size)
+
+        # Identifies our segment if another writer replaces it under the same name
+        self.inode = os.fstat(self.shm._fd).st_ino
+        HEADER.pack_into(
+            self.shm.buf, 0, MAGIC, width, height, self.channels, slots, 1, 0
+        )
+
+    def write(self, frame: bytes):
+        """Copies one frame into the next slot and publishes it."""
+        self.seq += 1
+        offset = HEADER_SIZE + ((self.seq - 1) % self.slots) * self.stride
+        buf = self.shm.buf
+        SLOT_HEADER.pack_into(buf, offset, 0, 0.0)
+        start = offset + SLOT_HEADER.size
+        buf[start : start + self.frame_size] = frame
+        SLOT_HEADER.pack_into(buf, offset, self.seq, time.time())
+        struct.pack_into("<Q", buf, HEADER.size - 8, self.seq)
+
+    def close(self):
+        """Marks the segment closed for readers and removes it, unless it was replaced."""
+        struct.pack_into("<I", self.shm.buf, HEADER.size - 12, 0)
+        try:
+            # During a profile switch the new pipeline's writer takes over the name
+            still_ours = os.stat(f"/dev/shm/{self.shm.name}").st_ino == self.inode
+        except FileNotFoundError:
+            still_ours = False
+        self.shm.close()
+        if still_ours:
+            self.shm.unlink()
+
+
+class FrameTapReader:
+    """Reads the latest frame of a camera's frame tap as a zero-copy NumPy array.
+
+    The returned array is a view on the shared slot: it stays valid until the
+    writer wraps around the ring (`slots - 1` frames later). Check `is_valid(seq)`
+    after processing a frame to make sure it was not overwritten meanwhile.
+    """
+
+    def __init__(self, camera_id: str):
+        self.shm = SharedMemory(name=shm_name(camera_id))
+        # Python < 3.13 would unlink the writer's segment when this process exits
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        magic, width, height, channels, slots, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise ValueError(f"{self.shm.name} is not a frame tap segment")
+
+        self.slots = slots
+        self.stride = _slot_stride(width * height * channels)
+        self.frames = np.ndarray(
+            (slots, height, width, channels),
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=HEADER_SIZE + SLOT_HEADER.size,
+            strides=(self.stride, width * channels, channels, 1),
+        )
+
+    def _slot_offset(self, seq: int) -> int:
+        return HEADER_SIZE + ((seq - 1) % self.slots) * self.stride
+
+    def is_open(self) -> bool:
+        """False once the stream has stopped; reopen a reader for the next stream."""
+        return HEADER.unpack_from(self.shm.buf, 0)[5] == 1
+
+    def latest(self):
+        """Returns `(seq, timestamp, frame)` for the newest frame, or None if there is none."""
+        seq = HEADER.unpack_from(self.shm.buf, 0)[6]
+        if seq == 0 or not self.is_open():
+            return None
+        slot_seq, timestamp = SLOT_HEADER.unpack_from(self.shm.buf, self._slot_offset(seq))
+        if slot_seq != seq:
+            # Overwritten between the two reads, the writer is far ahead of us
+            return None
+        return seq, timestamp, self.frames[(seq - 1) % self.slots]
+
+    def is_valid(self, seq: int) -> bool:
+        """Check the frame returned for `seq` has not been overwritten since."""
+        return SLOT_HEADER.unpack_from(self.shm.buf, self._slot_offset(seq))[0] == seq
+
+    def close(self):
+        """Detaches from the segment. Frame arrays obtained from this reader become unusable."""
+        del self.frames
+        self.shm.close()
+
+
+async def pump_frames(
+    camera_id: str,
+    stdout: asyncio.StreamReader,
+    tap_settings: dict,
+    publish: asyncio.Event = None,
+):
+    """Reads raw frames from FFmpeg's stdout into the camera's ring buffer until EOF.
+
+    With `publish`, frames are read and dropped until the event is set: a
+    pipeline still on trial (profile switch) must not replace the segment of
+    the one that keeps serving readers if the trial fails. If the tap itself
+    fails, frames are still read and dropped until EOF.
+    """
+    writer = None
+    try:
+        try:
+            frame_size = (
+                tap_settings["width"]
+                * tap_settings["height"]
+                * PIX_FMT_CHANNELS[tap_settings["pix_fmt"]]
+            )
+            while True:
+                frame = await stdout.readexactly(frame_size)
+                if writer is None:
+                    if publish is not None and not publish.is_set():
+                        continue
+                    writer = FrameTapWriter(
+                        camera_id,
+                        tap_settings["width"],
+                        tap_settings["height"],
+                        tap_settings["pix_fmt"],
+                        tap_settings["slots"],
+                    )
+                writer.write(frame)
+        except asyncio.IncompleteReadError:
+            frames = writer.seq if writer else 0
+            logger.info(f"Frame tap for {camera_id} ended after {frames} frames")
+            return
+        except Exception:
+            # e.g. /dev/shm full: the live stream must go on without the tap
+            logger.exception(f"Frame tap for {camera_id} failed, dropping its frames")
+        # FFmpeg blocks once the pipe is full, which would freeze the SRT output too
+        while await stdout.read(DRAIN_CHUNK):
+            pass
+    finally:
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,141 @@
+import time
+
+DEFAULT_PATHS = {
+    "stat": "/proc/stat",
+    "temperature": "/sys/class/thermal/thermal_zone0/temp",
+    "throttled": "/sys/devices/platform/soc/soc:firmware/get_throttled",
+}
+# get_throttled bits that mean the SoC is slowed down right now
+THROTTLED_NOW = 0x2 | 0x4 | 0x8  # Frequency capped, throttled, soft temperature limit
+
+
+class EncodeGovernor:
+    """Steps stream encoding down under sustained CPU/thermal pressure, and back up with hysteresis.
+
+    Pressure is any of: SoC temperature >= `temp_high`, CPU usage >= `cpu_high`,
+    the firmware reporting throttling, or an FFmpeg encoder running slower than
+    `speed_low` (below 1.0x the stream falls behind). It clears only once every
+    signal is back under its low threshold (`temp_low`, `cpu_low`, `speed_ok`).
+    After `sustain` samples under pressure the governor goes one level down the
+    `levels` ladder; after `recover` clear samples it goes one level back up.
+    Two changes are always at least `min_dwell` seconds apart.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.paths = {**DEFAULT_PATHS, **config.get("paths", {})}
+        self.levels = config["levels"]
+        self.pressure_count = 0
+        self.clear_count = 0
+        self._last_cpu_times = None
+        self.last_metrics = {}
+        self.last_reasons = []
+
+    def _read(self, name: str):
+        try:
+            with open(self.paths[name], "r") as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def _cpu_usage(self):
+        """Busy fraction of all CPUs since the previous sample, from /proc/stat."""
+        stat = self._read("stat")
+        if stat is None:
+            return None
+        # "cpu  user nice system idle iowait irq softirq steal ..."
+        times = [int(value) for value in stat.splitlines()[0].split()[1:]]
+        idle = times[3] + (times[4] if len(times) > 4 else 0)
+        previous, self._last_cpu_times = self._last_cpu_times, (sum(times), idle)
+        if previous is None or sum(times) == previous[0]:
+            return None
+        return 1 - (idle - previous[1]) / (sum(times) - previous[0])
+
+    def sample(self, encoder_speeds=()) -> dict:
+        """Reads the current metrics; missing files give None."""
+        temperature = self._read("temperature")
+        throttled = self._read("throttled")
+        speeds = [speed for speed in encoder_speeds if speed is not None]
+        self.last_metrics = {
+            "cpu_usage": self._cpu_usage(),
+            "temperature_c": int(temperature) / 1000 if temperature else None,
+            "throttled": int(throttled, 16) if throttled else None,
+            "encoder_speed": min(speeds) if speeds else None,
+            "sampled_at": time.time(),
+        }
+        return self.last_metrics
+
+    def _assess(self, metrics: dict):
+        """Returns ("pressure" | "clear" | "neutral", reasons)."""
+        config = self.config
+        cpu = metrics["cpu_usage"]
+        temperature = metrics["temperature_c"]
+        throttled = metrics["throttled"]
+        speed = metrics["encoder_speed"]
+
+        reasons = []
+        if temperature is not None and temperature >= config["temp_high"]:
+            reasons.append(f"temperature {temperature:.1f}C")
+        if cpu is not None and cpu >= config["cpu_high"]:
+            reasons.append(f"cpu {cpu:.0%}")
+        if throttled is not None and throttled & THROTTLED_NOW:
+            reasons.append(f"throttled {throttled:#x}")
+        if speed is not None and speed < config["speed_low"]:
+            reasons.append(f"encoder speed {speed:.2f}x")
+        if reasons:
+            return "pressure", reasons
+
+        clear = (
+            (temperature is None or temperature <= config["temp_low"])
+            and (cpu is None or cpu <= config["cpu_low"])
+            and (speed is None or speed >= config["speed_ok"])
+        )
+        return ("clear" if clear else "neutral"), []
+
+    def decide(self, metrics: dict, level: int, changed_at: float, now: float) -> int:
+        """Returns the level to run at, given the current one and when it was set."""
+        assessment, self.last_reasons = self._assess(metrics)
+        if assessment == "pressure":
+            self.pressure_count += 1
+            self.clear_count = 0
+        elif assessment == "clear":
+            self.clear_count += 1
+            self.pressure_count = 0
+        else:
+            # Between the low and high thresholds: hold, neither counts
+            self.pressure_count = self.clear_count = 0
+
+        if now - changed_at < self.config["min_dwell"]:
+            return level
+        if self.pressure_count >= self.config["sustain"] and level < len(self.levels):
+            self.pressure_count = 0
+            return level + 1
+        if self.clear_count >= self.config["recover"] and level > 0:
+            self.clear_count = 0
+            return level - 1
+        return level
+
+    def overrides(self, level: int) -> dict:
+        """Encoding overrides of a level; level 0 runs streams as configured."""
+        level = min(level, len(self.levels))
+        return self.levels[level - 1] if level > 0 else {}
+
+
+def apply_overrides(ffmpeg_params: dict, profile: dict, overrides: dict):
+    """Returns copies of the FFmpeg params and profile degraded by governor overrides."""
+    ffmpeg_params = dict(ffmpeg_params)
+    profile = dict(profile)
+    if "preset" in overrides:
+        ffmpeg_params["preset"] = overrides["preset"]
+    if "framerate" in overrides:
+        profile["framerate"] = min(profile["framerate"], overrides["framerate"])
+    if "scale" in overrides:
+        profile["scale"] = overrides["scale"]
+        if "tile_width" in profile:
+            # A mosaic has no output scale: each tile shrinks to at most that size instead
+            width, height = (int(value) for value in overrides["scale"].split(":"))
+            if width > 0:
+                profile["tile_width"] = min(profile["tile_width"], width)
+            if height > 0:
+                profile["tile_height"] = min(profile["tile_height"], height)
+    return ffmpeg_params, profile
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from reolink import ReolinkCamera
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 30  # Seconds between two probes of a healthy camera
+RETRY_INTERVAL = 5  # Seconds before the first retry of a failing camera
+MAX_INTERVAL = 300  # Upper bound of the backoff for failing cameras
+PROBE_TIMEOUT = 3  # Seconds before a probe is considered failed
+FAILURE_THRESHOLD = 2  # Consecutive failures before a camera is reported offline
+TICK = 1  # Seconds between two scheduler passes
+HISTORY_SIZE = 20  # State transitions kept per camera
+
+
+class CameraHealthMonitor:
+    """Probes every camera in the background and keeps their cached reachability state.
+
+    Healthy cameras are probed every `probe_interval` seconds. A failing camera
+    is retried after `retry_interval`, then with an exponential backoff capped
+    at `max_interval`. A camera goes `unknown` -> `online`, or `degraded` on
+    its first failure and `offline` after `failure_threshold` failures in a row.
+    """
+
+    def __init__(
+        self,
+        cameras: dict,
+        probe_interval: float = PROBE_INTERVAL,
+        retry_interval: float = RETRY_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        timeout: float = PROBE_TIMEOUT,
+        failure_threshold: int = FAILURE_THRESHOLD,
+    ):
+        self.probe_interval = probe_interval
+        self.retry_interval = retry_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+
+        # One pooled connection per camera, reused across probes
+        self.session = requests.Session()
+        pool_size = max(1, len(cameras))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cameras = {
+            cam_id: ReolinkCamera(
+                cam_info["ip"],
+                cam_info["username"],
+                cam_info["password"],
+                session=self.session,
+            )
+            for cam_id, cam_info in cameras.items()
+        }
+        now = time.time()
+        self.states = {
+            cam_id: {
+                "state": "unknown",
+                "since": now,
+                "last_check": None,
+                "last_success": None,
+                "latency_ms": None,
+                "consecutive_failures": 0,
+                "next_check": now,
+                "error": None,
+                "transitions": deque(maxlen=HISTORY_SIZE),
+            }
+            for cam_id in self.cameras
+        }
+
+    def snapshot(self) -> dict:
+        """Returns the cached state of every camera, without probing anything."""
+        return {
+            cam_id: {**state, "transitions": list(state["transitions"])}
+            for cam_id, state in self.states.items()
+        }
+
+    def _set_state(self, cam_id: str, new_state: str, now: float):
+        state = self.states[cam_id]
+        if state["state"] != new_state:
+            logger.info(f"Camera {cam_id} is now {new_state} (was {state['state']})")
+            state["transitions"].append(
+                {"from": state["state"], "to": new_state, "at": now}
+            )
+            state["state"] = new_state
+            state["since"] = now
+
+    def _next_interval(self, failures: int) -> float:
+        if failures == 0:
+            return self.probe_interval
+        return min(self.retry_interval * 2 ** (failures - 1), self.max_interval)
+
+    async def probe(self, cam_id: str):
+        """Probes one camera with GetDevInfo and updates its state."""
+        state = self.states[cam_id]
+        start = time.time()
+        try:
+            result = await asyncio.to_thread(
+                self.cameras[cam_id].get_device_info, self.timeout
+            )
+            ok = bool(result) and result[0].get("code") == 0
+            error = None if ok else f"Unexpected answer: {result}"
+        except Exception as e:
+            # Any failure, including an answer of unexpected shape, counts against the camera
+            ok, error = False, f"{type(e).__name__}: {e}"
+
+        now = time.time()
+        state["last_check"] = now
+        state["error"] = error
+        if ok:
+            state["last_success"] = now
+            state["latency_ms"] = round((now - start) * 1000)
+            state["consecutive_failures"] = 0
+            self._set_state(cam_id, "online", now)
+        else:
+            state["consecutive_failures"] += 1
+            self._set_state(
+                cam_id,
+                (
+                    "offline"
+                    if state["consecutive_failures"] >= self.failure_threshold
+                    else "degraded"
+                ),
+                now,
+            )
+        state["next_check"] = now + self._next_interval(state["consecutive_failures"])
+
+    async def run(self):
+        """Background loop probing, concurrently, every camera that is due."""
+        while True:
+            now = time.time()
+            due = [
+                cam_id
+                for cam_id, state in self.states.items()
+                if state["next_check"] <= now
+            ]
+            if due:
+                results = await asyncio.gather(
+                    *(self.probe(cam_id) for cam_id in due), return_exceptions=True
+                )
+                for cam_id, result in zip(due, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Health probe of {cam_id} failed: {result}")
+            await asyncio.sleep(TICK)
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
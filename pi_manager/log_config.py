@@ -0,0 +1,173 @@
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_CONFIG = {
+    "level": "INFO",
+    "loggers": {},
+    "console": True,
+    "file": None,
+    "max_bytes": 1048576,
+    "backup_count": 3,
+    "rate_limit": {"burst": 5, "period": 60},
+}
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `burst` identical messages per logger through every `period` seconds.
+
+    The first message let through after a suppression reports how many
+    similar messages were dropped, so retry loops stay visible without
+    flooding the disk.
+    """
+
+    def __init__(self, burst: int, period: float):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._windows = {}  # (logger, level, message) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > 10000:
+                    # Forget stale keys so unique messages cannot grow this forever
+                    self._windows = {
+                        k: w
+                        for k, w in self._windows.items()
+                        if now - w[0] < self.period
+                    }
+            else:
+                window[1] += 1
+                if window[1] > self.burst:
+                    window[2] += 1
+                    return False
+                suppressed = 0
+
+        if suppressed:
+            record.msg = (
+                f"{record.getMessage()} "
+                f"[{suppressed} similar messages suppressed in the last {self.period}s]"
+            )
+            record.args = None
+        return True
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that several processes (uvicorn workers) can share.
+
+    Each write and rotation holds an flock on `<file>.lock`, and a process
+    whose open file was rotated away by another one reopens the new file
+    before writing, so records are neither lost nor written to a backup.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        lock_path = f"{self.baseFilename}.lock"
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _rotated_away(self) -> bool:
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            return True
+        return current != os.fstat(self.stream.fileno()).st_ino
+
+    def emit(self, record: logging.LogRecord):
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            if self.stream is not None and self._rotated_away():
+                self.stream.close()
+                self.stream = None  # Reopened by emit()
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+def setup_logging(config: dict = None) -> QueueListener:
+    """Routes all logging through a queue so callers never block on console or disk I/O.
+
+    Records are filtered (levels, rate limit) in the calling thread and put
+    on an unbounded queue; a background thread writes them to the console and,
+    if `file` is set, to size-rotated files shared by all workers. Returns the
+    started listener; call `stop()` on it at shutdown to flush pending records.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()] if config["console"] else []
+    if config["file"]:
+        os.makedirs(os.path.dirname(config["file"]) or ".", exist_ok=True)
+        # Shared by every worker, see SharedRotatingFileHandler
+        handlers.append(
+            SharedRotatingFileHandler(
+                config["file"], config["max_bytes"], config["backup_count"]
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    rate_limit = config["rate_limit"]
+    if rate_limit:
+        queue_handler.addFilter(
+            RateLimitFilter(rate_limit["burst"], rate_limit["period"])
+        )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config["level"])
+    for name, level in config["loggers"].items():
+        logging.getLogger(name).setLevel(level)
+
+    # Third-party loggers that install their own handlers (uvicorn) go through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def benchmark(n: int = 100000) -> dict:
+    """Measures the cost of a log call on the calling thread, in microseconds."""
+    listener = setup_logging(
+        {"console": False, "file": "logs/benchmark.log", "rate_limit": None}
+    )
+    logger = logging.getLogger("benchmark")
+    results = {}
+    for label, level in (("emitted", logging.INFO), ("filtered_out", logging.DEBUG)):
+        start = time.perf_counter()
+        for i in range(n):
+            logger.log(level, "hot path message %d", i)
+        results[f"{label}_us"] = (time.perf_counter() - start) / n * 1e6
+    listener.stop()
+    return results
+
+
+if __name__ == "__main__":
+    print(benchmark())
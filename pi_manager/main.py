@@ -1,285 +1,622 @@
+import asyncio
 import logging
-import subprocess
-import threading
+import os
 import time
-import yaml
-import requests
+from contextlib import asynccontextmanager
 import urllib3
-from fastapi import FastAPI
-from dotenv import load_dotenv
-import os
-import json
-
-app = FastAPI()
-processes = {}  # Store FFmpeg processes
-last_command_time = time.time()  # Track the last command time
-timer_thread = None  # Background thread for checking inactivity
+from fastapi import APIRouter, FastAPI, Request
+
+from capabilities import CapabilityCache, clamp
+from frame_tap import pump_frames
+from governor import EncodeGovernor, apply_overrides
+from health import CameraHealthMonitor
+from log_config import setup_logging
+from process_utils import (
+    is_pid_running,
+    open_pipe_reader,
+    start_process,
+    stop_pid,
+    stop_process,
+    watch_ffmpeg_stderr,
+)
+from reolink import ReolinkCamera
+from settings import get_settings
+from stream_builder import build_ffmpeg_command, build_mosaic_command
+from stream_state import StreamStateStore
+
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT = 60  # Seconds without command before streams are stopped
+IDLE_CHECK_INTERVAL = 5  # Seconds between two inactivity checks
+SWITCH_TIMEOUT = 15  # Seconds for a new pipeline to output frames during a profile switch
+MOSAIC_ID = "mosaic"  # Stream record of the mosaic, in place of a camera ID
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-logging.basicConfig(level=logging.DEBUG)
 
+router = APIRouter()
 
-# Load ffmpeg config (YAML)
-with open("ffmpeg_config.yaml", "r") as file:
-    ffmpeg_config = yaml.safe_load(file)
 
-SRT_SETTINGS = ffmpeg_config["srt_settings"]
-FFMPEG_PARAMS = ffmpeg_config["ffmpeg_params"]
+def get_camera(app: FastAPI, camera_id: str):
+    """Returns a ReolinkCamera for a configured camera ID, or None."""
+    cameras = app.state.settings["cameras"]
+    if camera_id not in cameras:
+        return None
+    return ReolinkCamera(
+        cameras[camera_id]["ip"],
+        cameras[camera_id]["username"],
+        cameras[camera_id]["password"],
+    )
 
 
-# Load environment variables
-load_dotenv()
+async def register_command(app: FastAPI):
+    """Records operator activity, pushing back the inactivity deadline of every stream."""
+    await asyncio.to_thread(app.state.store.touch, IDLE_TIMEOUT)
+
+
+async def stop_streams(app: FastAPI, entries):
+    """Stops the given stream records, whichever worker started them. Returns the stopped camera IDs."""
+    running = [entry["camera_id"] for entry in entries if is_pid_running(entry["pid"])]
+
+    async def stop_entry(entry):
+        proc = app.state.processes.pop(entry["pid"], None)
+        app.state.stream_stats.pop(entry["pid"], None)
+        if proc is not None:
+            await stop_process(proc)
+        else:
+            await stop_pid(entry["pid"])
+
+    await asyncio.gather(*(stop_entry(entry) for entry in entries))
+    return running
+
+
+def mosaic_cameras(app: FastAPI):
+    """Cameras to tile in the mosaic, leaving out those the health monitor reports offline."""
+    cameras = app.state.settings["mosaic"]["cameras"]
+    states = app.state.health.states
+    online = [cam_id for cam_id in cameras if states[cam_id]["state"] != "offline"]
+    # A dead input would fail the whole mosaic, but so would an empty one
+    return online or cameras
+
+
+def stream_info(app: FastAPI, camera_id: str) -> dict:
+    """Output URL and port of a camera's stream, or of the mosaic."""
+    settings = app.state.settings
+    return settings["mosaic"] if camera_id == MOSAIC_ID else settings["streams"][camera_id]
+
+
+async def launch_stream(
+    app: FastAPI,
+    camera_id: str,
+    profile: str,
+    publish: asyncio.Event = None,
+    cameras: list = None,
+):
+    """Starts the FFmpeg pipeline of a camera with a quality profile.
+
+    With `MOSAIC_ID`, starts the mosaic of `cameras` instead (by default those
+    `mosaic_cameras` returns), pulling the `profile` input of each. With
+    `publish`, frames reach the frame tap only once that event is set. Returns
+    the process and an event set once it outputs frames.
+    """
+    settings = app.state.settings
+    overrides = (await governor_state(app))["overrides"]
+    frame_tap = settings["frame_tap"]
+    tap_pipes = {}  # camera_id -> (read fd, write fd), frame taps of a mosaic
+    if camera_id == MOSAIC_ID:
+        if cameras is None:
+            cameras = mosaic_cameras(app)
+        if frame_tap["enabled"]:
+            # One pipe per camera, so detection keeps every camera during a mosaic
+            tap_pipes = {cam_id: os.pipe() for cam_id in cameras}
+        mosaic = settings["mosaic"]
+        ffmpeg_params, mosaic = apply_overrides(
+            settings["ffmpeg_params"], mosaic, overrides
+        )
+        command = build_mosaic_command(
+            [settings["streams"][cam_id]["input_urls"][profile] for cam_id in cameras],
+            mosaic["output_url"],
+            ffmpeg_params,
+            mosaic,
+            frame_tap,
+            [f"pipe:{write_fd}" for _, write_fd in tap_pipes.values()],
+        )
+    else:
+        stream = settings["streams"][camera_id]
+        # Degraded by the governor when the Pi is under pressure
+        ffmpeg_params, profile_params = apply_overrides(
+            settings["ffmpeg_params"], settings["profiles"][profile], overrides
+        )
+        command = build_ffmpeg_command(
+            stream["input_urls"][profile],
+            stream["output_url"],
+            ffmpeg_params,
+            frame_tap,
+            profile_params,
+            settings["latency_probe"],
+        )
+
+    try:
+        proc = await start_process(
+            command,
+            stdout=(
+                asyncio.subprocess.PIPE
+                if frame_tap["enabled"] and camera_id != MOSAIC_ID
+                else asyncio.subprocess.DEVNULL
+            ),
+            stderr=asyncio.subprocess.PIPE,
+            pass_fds=[write_fd for _, write_fd in tap_pipes.values()],
+        )
+    except OSError:
+        for read_fd, _ in tap_pipes.values():
+            os.close(read_fd)
+        raise
+    finally:
+        # Only FFmpeg writes to the taps, so they reach EOF when it exits
+        for _, write_fd in tap_pipes.values():
+            os.close(write_fd)
+    app.state.processes[proc.pid] = proc
+    app.state.stream_stats[proc.pid] = stats = {"camera_id": camera_id, "speed": None}
+
+    # Both tasks end by themselves when FFmpeg exits and its pipes close
+    ready = asyncio.Event()
+    coros = []
+    if tap_pipes:
+        for cam_id, (read_fd, _) in tap_pipes.items():
+            reader = await open_pipe_reader(read_fd)
+            coros.append(pump_frames(cam_id, reader, frame_tap, publish))
+    elif frame_tap["enabled"]:
+        coros.append(pump_frames(camera_id, proc.stdout, frame_tap, publish))
+    coros.append(watch_ffmpeg_stderr(camera_id, proc.stderr, ready, stats))
+    for coro in coros:
+        task = asyncio.create_task(coro)
+        app.state.stream_tasks.add(task)
+        task.add_done_callback(app.state.stream_tasks.discard)
+        task.add_done_callback(log_task_error)
+    # Stale speeds of exited processes must not reach the governor
+    task.add_done_callback(lambda _: app.state.stream_stats.pop(proc.pid, None))
+    return proc, ready
+
+
+def log_task_error(task: asyncio.Task):
+    """Done callback reporting the error of a pipe reader, which nothing awaits."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("FFmpeg pipe reader failed", exc_info=task.exception())
+
+
+async def wait_until_ready(proc, ready: asyncio.Event, timeout: float) -> bool:
+    """Waits for a pipeline to output frames. False if it exited or timed out first."""
+    ready_task = asyncio.create_task(ready.wait())
+    exit_task = asyncio.create_task(proc.wait())
+    await asyncio.wait(
+        {ready_task, exit_task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+    )
+    ready_task.cancel()
+    exit_task.cancel()
+    return ready.is_set() and proc.returncode is None
+
+
+async def start_stream_locked(
+    app: FastAPI, camera_id: str, profile: str, cameras: list = None
+):
+    """Launches a stream and records it. Callers must hold the store's exclusive lock."""
+    proc, ready = await launch_stream(app, camera_id, profile, cameras=cameras)
+    await asyncio.to_thread(
+        app.state.store.add,
+        camera_id,
+        proc.pid,
+        stream_info(app, camera_id)["port"],
+        IDLE_TIMEOUT,
+        profile,
+    )
+    return proc, ready
+
+
+async def replace_stream(app: FastAPI, current: dict, profile: str) -> bool:
+    """Replaces a running stream by a new pipeline. Callers must hold the store's exclusive lock.
+
+    The new pipeline is brought up first and the old one is only stopped once
+    the new one outputs frames; if it fails, the old one keeps running, frame
+    tap included. The stream keeps its inactivity deadline. Returns False if
+    the new pipeline did not come up.
+    """
+    camera_id = current["camera_id"]
+    # The old pipeline keeps the frame tap until the new one is known to work
+    publish = asyncio.Event()
+    proc, ready = await launch_stream(app, camera_id, profile, publish)
+    if not await wait_until_ready(proc, ready, SWITCH_TIMEOUT):
+        await stop_streams(app, [{"camera_id": camera_id, "pid": proc.pid}])
+        return False
+
+    publish.set()
+    await asyncio.to_thread(
+        app.state.store.add,
+        camera_id,
+        proc.pid,
+        current["port"],
+        IDLE_TIMEOUT,
+        profile,
+        current["deadline"],
+    )
+    await stop_streams(app, [current])
+    return True
 
-CAM_USER = os.getenv("CAM_USER")
-CAM_PWD = os.getenv("CAM_PWD")
-MEDIAMTX_SERVER_IP = os.getenv("MEDIAMTX_SERVER_IP")
-STREAM_NAME = os.getenv("STREAM_NAME")
 
-# Load camera credentials
-with open("credentials.json", "r") as file:
-    credentials = json.load(file)
+async def governor_state(app: FastAPI) -> dict:
+    """Current governor level (shared by all workers) and its encoding overrides."""
+    state = await asyncio.to_thread(
+        app.state.store.get_value, "governor", {"level": 0, "changed_at": 0}
+    )
+    governor = app.state.governor
+    state["overrides"] = governor.overrides(state["level"]) if governor else {}
+    return state
 
-# Build cameras dictionary
-CAMERAS = {
-    cam_id: {"ip": ip, "username": CAM_USER, "password": CAM_PWD}
-    for cam_id, ip in credentials["cameras"].items()
-}
 
-# Build streams dictionary using config values
-STREAMS = {
-    cam_id: {
-        "input_url": f"rtsp://{CAM_USER}:{CAM_PWD}@{cam_info['ip']}/h264Preview_01_sub",
-        "output_url": (
-            f"srt://{MEDIAMTX_SERVER_IP}:{SRT_SETTINGS['port_start']}?"
-            f"pkt_size={SRT_SETTINGS['pkt_size']}&"
-            f"mode={SRT_SETTINGS['mode']}&"
-            f"latency={SRT_SETTINGS['latency']}&"
-            f"streamid={SRT_SETTINGS['streamid_prefix']}:{STREAM_NAME}"
+async def govern_streams(app: FastAPI):
+    """Background task stepping encoding down or up with CPU, thermal and encoder pressure."""
+    while True:
+        await asyncio.sleep(app.state.governor.config["interval"])
+        try:
+            await govern_once(app)
+        except Exception:
+            # A bad metrics file or a locked store must not stop the governor for good
+            logger.exception("Encode governor pass failed")
+
+
+async def govern_once(app: FastAPI):
+    """Samples the metrics once and changes the governor level if needed.
+
+    Every worker publishes the encoder speeds of its own FFmpeg children, but only the
+    worker holding the "governor_worker" role samples and decides from all of them, so
+    a worker owning no stream never steps the level back up under encoder pressure.
+    """
+    governor = app.state.governor
+    store = app.state.store
+    # A worker that stops renewing its speeds or the role is ignored after a few passes
+    ttl = 3 * governor.config["interval"]
+    await asyncio.to_thread(
+        store.set_value,
+        f"encoder_speeds:{os.getpid()}",
+        [stats["speed"] for stats in app.state.stream_stats.values()],
+    )
+    if not await asyncio.to_thread(store.claim, "governor_worker", ttl):
+        return
+    speeds = await asyncio.to_thread(store.recent_values, "encoder_speeds:", ttl)
+    metrics = governor.sample(speed for worker in speeds for speed in worker)
+    async with store.exclusive():
+        state = await governor_state(app)
+        level = governor.decide(
+            metrics, state["level"], state["changed_at"], time.time()
+        )
+        # Served by /governor from whichever worker gets the request
+        await asyncio.to_thread(
+            store.set_value,
+            "governor_metrics",
+            {"metrics": metrics, "pressure": governor.last_reasons},
+        )
+        if level == state["level"]:
+            return
+        await asyncio.to_thread(
+            store.set_value, "governor", {"level": level, "changed_at": time.time()}
+        )
+        logger.warning(
+            f"Encode governor level {state['level']} -> {level} "
+            f"({', '.join(governor.last_reasons) or 'pressure cleared'})"
+        )
+
+        # Rebuild running streams with the new encoding settings, without an outage
+        for entry in await asyncio.to_thread(store.list_streams):
+            if not is_pid_running(entry["pid"]):
+                continue
+            try:
+                replaced = await replace_stream(app, entry, entry["profile"])
+            except OSError as e:
+                logger.error(f"Failed to restart FFmpeg for {entry['camera_id']}: {e}")
+                replaced = False
+            if not replaced:
+                logger.error(
+                    f"Stream for {entry['camera_id']} keeps its previous encoding settings"
+                )
+
+
+async def stop_any_running_stream(app: FastAPI):
+    """Stops every running stream. Callers must hold the store's exclusive lock."""
+    return await stop_streams(app, await asyncio.to_thread(app.state.store.pop_all))
+
+
+async def stop_stream_if_idle(app: FastAPI):
+    """Background task that stops streams whose inactivity deadline has passed."""
+    store = app.state.store
+    while True:
+        await asyncio.sleep(IDLE_CHECK_INTERVAL)
+        try:
+            async with store.exclusive():
+                stopped_cams = await stop_streams(
+                    app, await asyncio.to_thread(store.pop_expired)
+                )
+        except Exception:
+            # e.g. "database is locked": retry on the next pass instead of dying silently
+            logger.exception("Inactivity check failed")
+            continue
+        for cam_id in stopped_cams:
+            logger.info(f"Stream for {cam_id} stopped due to inactivity")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads settings and shared state, and stops this worker's FFmpeg children on shutdown."""
+    settings = get_settings()
+    app.state.settings = settings
+    app.state.log_listener = setup_logging(settings["logging"])
+    app.state.store = StreamStateStore(settings["state_db"])
+    app.state.processes = {}  # FFmpeg processes started by this worker, by PID
+    app.state.stream_tasks = set()  # Tasks reading the output pipes of FFmpeg
+    app.state.stream_stats = {}  # Progress of FFmpeg processes started by this worker, by PID
+    app.state.capabilities = CapabilityCache()
+    app.state.health = CameraHealthMonitor(settings["cameras"])
+    governor_config = settings["governor"]
+    app.state.governor = (
+        EncodeGovernor(governor_config) if governor_config["enabled"] else None
+    )
+
+    background_tasks = [
+        asyncio.create_task(stop_stream_if_idle(app)),
+        asyncio.create_task(app.state.health.run()),
+    ]
+    if app.state.governor:
+        background_tasks.append(asyncio.create_task(govern_streams(app)))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        app.state.health.close()
+        async with app.state.store.exclusive():
+            owned = await asyncio.to_thread(app.state.store.pop_owned, os.getpid())
+            await stop_streams(app, owned)
+        await asyncio.gather(*app.state.stream_tasks, return_exceptions=True)
+        app.state.log_listener.stop()
+
+
+@router.post("/start_stream/{camera_id}")
+async def start_stream(camera_id: str, request: Request, profile: str = None):
+    """Starts an FFmpeg stream for a given camera, with the default quality profile unless specified."""
+    app = request.app
+    await register_command(app)
+
+    streams = app.state.settings["streams"]
+    if camera_id not in streams:
+        return {"error": "Invalid camera ID."}
+
+    profile = profile or app.state.settings["default_profile"]
+    if profile not in app.state.settings["profiles"]:
+        return {"error": f"Invalid profile {profile}."}
+
+    async with app.state.store.exclusive():
+        # Stop any existing stream, including ones started by other workers
+        stopped_cams = await stop_any_running_stream(app)
+        try:
+            await start_stream_locked(app, camera_id, profile)
+        except OSError as e:
+            logger.error(f"Failed to start FFmpeg for {camera_id}: {e}")
+            return {"error": f"Could not start stream for {camera_id}."}
+
+    return {
+        "message": f"Stream for {camera_id} started ({profile} profile)",
+        "previous_stream": (
+            ", ".join(stopped_cams)
+            if stopped_cams
+            else "No previous stream was running"
         ),
     }
-    for cam_id, cam_info in CAMERAS.items()
-}
-
-
-class ReolinkCamera:
-    """Class to control a Reolink camera."""
-
-    def __init__(
-        self, ip_address: str, username: str, password: str, protocol: str = "https"
-    ):
-        self.ip_address = ip_address
-        self.username = username
-        self.password = password
-        self.protocol = protocol
-
-    def _build_url(self, command: str) -> str:
-        """Builds the request URL for the camera API."""
-        return f"{self.protocol}://{self.ip_address}/cgi-bin/api.cgi?cmd={command}&user={self.username}&password={self.password}&channel=0"
-
-    def move_camera(self, operation: str, speed: int = 10):
-        """Moves the camera in a given direction."""
-        url = self._build_url("PtzCtrl")
-        data = [
-            {
-                "cmd": "PtzCtrl",
-                "action": 0,
-                "param": {"channel": 0, "op": operation, "speed": speed},
-            }
-        ]
-        response = requests.post(url, json=data, verify=False)
-        return response.json() if response.status_code == 200 else None
-
-    def stop_camera(self):
-        """Stops the camera movement."""
-        return self.move_camera("Stop")
-
-    def zoom(self, position: int):
-        """Adjusts the zoom level of the camera."""
-        url = self._build_url("StartZoomFocus")
-        data = [
-            {
-                "cmd": "StartZoomFocus",
-                "action": 0,
-                "param": {
-                    "ZoomFocus": {"channel": 0, "pos": position, "op": "ZoomPos"}
-                },
-            }
-        ]
-        response = requests.post(url, json=data, verify=False)
-        return response.json() if response.status_code == 200 else None
 
 
-def is_process_running(proc):
-    """Check if a process is still running."""
-    return proc and proc.poll() is None
+@router.post("/start_mosaic")
+async def start_mosaic(request: Request):
+    """Starts one stream tiling several cameras, replacing any running stream."""
+    app = request.app
+    await register_command(app)
 
+    mosaic = app.state.settings["mosaic"]
+    if not mosaic or not mosaic["cameras"]:
+        return {"error": "Mosaic mode is not configured."}
 
-def stop_any_running_stream():
-    """Stops any currently running stream."""
-    for cam_id, proc in list(processes.items()):
-        if is_process_running(proc):
-            proc.terminate()
-            proc.wait()
-            del processes[cam_id]
-            return cam_id
-    return None
+    async with app.state.store.exclusive():
+        stopped_cams = await stop_any_running_stream(app)
+        cameras = mosaic_cameras(app)
+        try:
+            # The same list is tiled and reported, whatever the health monitor sees meanwhile
+            await start_stream_locked(app, MOSAIC_ID, mosaic["profile"], cameras)
+        except OSError as e:
+            logger.error(f"Failed to start FFmpeg for the mosaic: {e}")
+            return {"error": "Could not start the mosaic stream."}
 
+    return {
+        "message": f"Mosaic of {', '.join(cameras)} started ({mosaic['layout']} layout)",
+        "previous_stream": (
+            ", ".join(stopped_cams)
+            if stopped_cams
+            else "No previous stream was running"
+        ),
+    }
 
-def stop_stream_if_idle():
-    """Background task that stops the stream if no command is received for 60 seconds."""
-    global last_command_time
-    while True:
-        time.sleep(60)
-        if time.time() - last_command_time > 60:
-            stopped_cam = stop_any_running_stream()
-            if stopped_cam:
-                logging.info(f"Stream for {stopped_cam} stopped due to inactivity")
 
+@router.post("/stream_profile/{camera_id}/{profile}")
+async def switch_stream_profile(camera_id: str, profile: str, request: Request):
+    """Switches a running stream to another quality profile.
+
+    The new pipeline is brought up first and the old one is only stopped once
+    the new one outputs frames, so the SRT consumer sees a short gap instead of
+    a full restart. If the new pipeline fails, the old one keeps running.
+    """
+    app = request.app
+    await register_command(app)
+
+    if profile not in app.state.settings["profiles"]:
+        return {"error": f"Invalid profile {profile}."}
+    if camera_id == MOSAIC_ID:
+        return {"error": "The mosaic has no quality profiles, see the mosaic config."}
+
+    store = app.state.store
+    async with store.exclusive():
+        current = await asyncio.to_thread(store.get, camera_id)
+        if current is None or not is_pid_running(current["pid"]):
+            return {"error": f"No active stream for {camera_id}."}
+        if current["profile"] == profile:
+            return {"message": f"Stream for {camera_id} already uses the {profile} profile"}
+
+        try:
+            switched = await replace_stream(app, current, profile)
+        except OSError as e:
+            logger.error(f"Failed to start FFmpeg for {camera_id}: {e}")
+            return {"error": f"Could not start the {profile} profile for {camera_id}."}
+        if not switched:
+            return {
+                "error": (
+                    f"Could not switch {camera_id} to the {profile} profile, "
+                    f"keeping {current['profile']}."
+                )
+            }
 
-# Start background thread
-timer_thread = threading.Thread(target=stop_stream_if_idle, daemon=True)
-timer_thread.start()
+    return {"message": f"Stream for {camera_id} switched to the {profile} profile"}
 
 
-@app.post("/start_stream/{camera_id}")
-async def start_stream(camera_id: str):
-    """Starts an FFmpeg stream for a given camera."""
-    global last_command_time
-    last_command_time = time.time()
+@router.post("/stop_stream")
+async def stop_stream(request: Request):
+    """Stops any active stream."""
+    app = request.app
+    await register_command(app)
 
-    if camera_id not in STREAMS:
-        return {"error": "Invalid camera ID."}
+    async with app.state.store.exclusive():
+        stopped_cams = await stop_any_running_stream(app)
+    if stopped_cams:
+        return {"message": f"Stream for {', '.join(stopped_cams)} stopped"}
+    return {"message": "No active stream was running"}
 
-    # Stop any existing stream
-    stopped_cam = stop_any_running_stream()
-
-    stream_info = STREAMS[camera_id]
-    input_url = stream_info["input_url"]
-    output_url = stream_info["output_url"]
-
-    # Build ffmpeg command dynamically based on config
-    command = ["ffmpeg"]
-
-    if FFMPEG_PARAMS["discardcorrupt"]:
-        command += ["-fflags", "discardcorrupt+nobuffer"]
-    if FFMPEG_PARAMS["low_delay"]:
-        command += ["-flags", "low_delay"]
-
-    command += [
-        "-rtsp_transport",
-        FFMPEG_PARAMS["rtsp_transport"],
-        "-i",
-        input_url,
-        "-c:v",
-        FFMPEG_PARAMS["video_codec"],
-        "-bf",
-        str(FFMPEG_PARAMS["b_frames"]),
-        "-b:v",
-        FFMPEG_PARAMS["bitrate"],
-        "-r",
-        str(FFMPEG_PARAMS["framerate"]),
-        "-preset",
-        FFMPEG_PARAMS["preset"],
-        "-tune",
-        FFMPEG_PARAMS["tune"],
-    ]
 
-    if FFMPEG_PARAMS["audio_disabled"]:
-        command.append("-an")
+@router.get("/status")
+async def stream_status(request: Request):
+    """Returns which stream is currently running."""
+    app = request.app
+    await register_command(app)
+
+    active_streams = []
+    profiles = {}
+    for entry in await asyncio.to_thread(app.state.store.list_streams):
+        if is_pid_running(entry["pid"]):
+            active_streams.append(entry["camera_id"])
+            profiles[entry["camera_id"]] = entry["profile"]
+        else:
+            # FFmpeg exited on its own, forget it
+            await asyncio.to_thread(
+                app.state.store.remove, entry["camera_id"], entry["pid"]
+            )
+            app.state.processes.pop(entry["pid"], None)
+    if active_streams:
+        return {"active_streams": active_streams, "profiles": profiles}
+    return {"message": "No stream is running"}
 
-    command += ["-f", FFMPEG_PARAMS["output_format"], output_url]
 
-    processes[camera_id] = subprocess.Popen(
-        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
+@router.get("/governor")
+async def governor_status(request: Request):
+    """Returns the encode governor level, its overrides and the last metrics it saw."""
+    app = request.app
+    governor = app.state.governor
+    if governor is None:
+        return {"enabled": False}
 
+    state = await governor_state(app)
+    latest = await asyncio.to_thread(
+        app.state.store.get_value, "governor_metrics", {"metrics": {}, "pressure": []}
+    )
     return {
-        "message": f"Stream for {camera_id} started",
-        "previous_stream": (
-            stopped_cam if stopped_cam else "No previous stream was running"
-        ),
+        "enabled": True,
+        "level": state["level"],
+        "max_level": len(governor.levels),
+        "changed_at": state["changed_at"],
+        "overrides": state["overrides"],
+        "metrics": latest["metrics"],
+        "pressure": latest["pressure"],
     }
 
 
-@app.post("/stop_stream")
-async def stop_stream():
-    """Stops any active stream."""
-    global last_command_time
-    last_command_time = time.time()
-
-    stopped_cam = stop_any_running_stream()
-    if stopped_cam:
-        return {"message": f"Stream for {stopped_cam} stopped"}
-    return {"message": "No active stream was running"}
+@router.get("/health")
+async def camera_health(request: Request):
+    """Returns the last known reachability of every camera, without probing them."""
+    return request.app.state.health.snapshot()
 
 
-@app.get("/status")
-async def stream_status():
-    """Returns which stream is currently running."""
-    global last_command_time
-    last_command_time = time.time()
+@router.get("/capabilities/{camera_id}")
+async def camera_capabilities(camera_id: str, request: Request):
+    """Returns the cached abilities and value ranges of a camera."""
+    cam = get_camera(request.app, camera_id)
+    if cam is None:
+        return {"error": "Invalid camera ID."}
 
-    active_streams = [
-        cam_id for cam_id, proc in processes.items() if is_process_running(proc)
-    ]
-    if active_streams:
-        return {"active_streams": active_streams}
-    return {"message": "No stream is running"}
+    entry = await request.app.state.capabilities.get(camera_id, cam)
+    return {
+        "camera_id": camera_id,
+        "source": entry["source"],
+        "fetched_at": entry["fetched_at"],
+        **entry["capabilities"],
+    }
 
 
-@app.post("/move/{camera_id}/{direction}/{speed}")
-async def move_camera(camera_id: str, direction: str, speed: int):
+@router.post("/move/{camera_id}/{direction}/{speed}")
+async def move_camera(camera_id: str, direction: str, speed: int, request: Request):
     """Moves the camera in the specified direction (Up, Right, Down, Left) with a given speed."""
-    global last_command_time
-    last_command_time = time.time()  # Update last command time
+    await register_command(request.app)  # Update last command time
 
-    if camera_id not in CAMERAS:
+    cam = get_camera(request.app, camera_id)
+    if cam is None:
         return {"error": "Invalid camera ID. Use 'cam1' or 'cam2'."}
 
-    cam = ReolinkCamera(
-        CAMERAS[camera_id]["ip"],
-        CAMERAS[camera_id]["username"],
-        CAMERAS[camera_id]["password"],
-    )
-    cam.move_camera(direction, speed=speed)
+    capabilities = await request.app.state.capabilities.get_capabilities(camera_id, cam)
+    if direction not in capabilities["directions"]:
+        return {
+            "error": f"Direction must be one of {', '.join(capabilities['directions'])}."
+        }
+    speed = clamp(speed, capabilities["speed"])
+
+    await asyncio.to_thread(cam.move_camera, direction, speed=speed)
     return {"message": f"Camera {camera_id} moved {direction} at speed {speed}"}
 
 
-@app.post("/stop/{camera_id}")
-async def stop_camera(camera_id: str):
+@router.post("/stop/{camera_id}")
+async def stop_camera(camera_id: str, request: Request):
     """Stops the camera movement."""
-    global last_command_time
-    last_command_time = time.time()
+    await register_command(request.app)
 
-    if camera_id not in CAMERAS:
+    cam = get_camera(request.app, camera_id)
+    if cam is None:
         return {"error": "Invalid camera ID."}
 
-    cam = ReolinkCamera(
-        CAMERAS[camera_id]["ip"],
-        CAMERAS[camera_id]["username"],
-        CAMERAS[camera_id]["password"],
-    )
-    cam.stop_camera()
+    await asyncio.to_thread(cam.stop_camera)
     return {"message": f"Camera {camera_id} stopped moving"}
 
 
-@app.post("/zoom/{camera_id}/{level}")
-async def zoom_camera(camera_id: str, level: int):
-    """Adjusts the camera zoom level (0 to 64)."""
-    global last_command_time
-    last_command_time = time.time()
+@router.post("/zoom/{camera_id}/{level}")
+async def zoom_camera(camera_id: str, level: int, request: Request):
+    """Adjusts the camera zoom level, clamped to the range reported by the camera."""
+    await register_command(request.app)
 
-    if camera_id not in CAMERAS:
+    cam = get_camera(request.app, camera_id)
+    if cam is None:
         return {"error": "Invalid camera ID."}
 
-    if not (0 <= level <= 64):
-        return {"error": "Zoom level must be between 0 and 64."}
+    capabilities = await request.app.state.capabilities.get_capabilities(camera_id, cam)
+    level = clamp(level, capabilities["zoom"])
 
-    cam = ReolinkCamera(
-        CAMERAS[camera_id]["ip"],
-        CAMERAS[camera_id]["username"],
-        CAMERAS[camera_id]["password"],
-    )
-    cam.zoom(level)
+    await asyncio.to_thread(cam.zoom, level)
     return {"message": f"Camera {camera_id} zoom set to {level}"}
+
+
+def create_app() -> FastAPI:
+    """Builds the API. Config files are only read when the app starts up."""
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
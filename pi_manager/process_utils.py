@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import signal
+from contextlib import suppress
+
+logger = logging.getLogger(__name__)
+
+STOP_TIMEOUT = 5  # Seconds to wait after SIGTERM before sending SIGKILL
+POLL_INTERVAL = 0.1  # Seconds between liveness checks of processes we don't own
+
+
+def is_process_running(proc):
+    """Check if a process is still running."""
+    return proc is not None and proc.returncode is None
+
+
+def is_pid_running(pid: int) -> bool:
+    """Check if a PID (possibly owned by another worker) is alive and not a zombie."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat", "r") as file:
+            # The state follows the parenthesised command name
+            return file.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def signal_process_group(pgid: int, sig: int):
+    """Sends a signal to a whole process group, ignoring groups that are already gone."""
+    with suppress(ProcessLookupError, PermissionError):
+        os.killpg(pgid, sig)
+
+
+async def start_process(
+    command,
+    stdout=asyncio.subprocess.DEVNULL,
+    stderr=asyncio.subprocess.DEVNULL,
+    pass_fds=(),
+):
+    """Starts a command in its own process group so it can be torn down as a whole.
+
+    `pass_fds` are extra descriptors (e.g. pipe write ends) the child inherits.
+    """
+    # Output is discarded unless the caller reads it: an unread PIPE eventually
+    # fills up and stalls ffmpeg
+    return await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=stdout,
+        stderr=stderr,
+        start_new_session=True,
+        pass_fds=pass_fds,
+    )
+
+
+async def open_pipe_reader(fd: int) -> asyncio.StreamReader:
+    """Wraps the read end of an `os.pipe()` in a StreamReader; it reaches EOF when the writer exits."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0)
+    )
+    return reader
+
+
+async def stop_process(proc, timeout: float = STOP_TIMEOUT):
+    """Stops a process with SIGTERM, escalating to SIGKILL after `timeout` seconds."""
+    if is_process_running(proc):
+        # start_new_session makes the child a group leader, so pgid == pid
+        signal_process_group(proc.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Process {proc.pid} did not exit after {timeout}s, sending SIGKILL"
+            )
+            signal_process_group(proc.pid, signal.SIGKILL)
+            await proc.wait()
+    # Clean up anything the process may have left behind in its group
+    signal_process_group(proc.pid, signal.SIGKILL)
+
+
+async def stop_pid(pid: int, timeout: float = STOP_TIMEOUT):
+    """Same as `stop_process` for a process group started by another worker."""
+    if is_pid_running(pid):
+        signal_process_group(pid, signal.SIGTERM)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while is_pid_running(pid) and loop.time() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+        if is_pid_running(pid):
+            logger.warning(
+                f"Process {pid} did not exit after {timeout}s, sending SIGKILL"
+            )
+    signal_process_group(pid, signal.SIGKILL)
+
+
+async def watch_ffmpeg_stderr(
+    name: str, stderr: asyncio.StreamReader, ready: asyncio.Event, stats: dict = None
+):
+    """Drains FFmpeg's stderr until EOF, setting `ready` once frames are being output.
+
+    Expects `-progress pipe:2 -nostats`: `key=value` progress lines are parsed,
+    anything else is an FFmpeg error message and gets logged. The encoding
+    speed (1.0 = real time) is kept in `stats["speed"]`.
+    """
+    while line := await stderr.readline():
+        key, sep, value = line.decode(errors="replace").strip().partition("=")
+        if not sep or " " in key:
+            logger.warning(f"ffmpeg[{name}]: {line.decode(errors='replace').strip()}")
+        elif key == "frame" and value.isdigit() and int(value) > 0:
+            ready.set()
+        elif key == "speed" and stats is not None:
+            # "0.98x", or "N/A" until enough frames went through
+            with suppress(ValueError):
+                stats["speed"] = float(value.strip().rstrip("x"))
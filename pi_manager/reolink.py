@@ -0,0 +1,78 @@
+import requests
+
+
+class ReolinkCamera:
+    """Class to control a Reolink camera."""
+
+    def __init__(
+        self,
+        ip_address: str,
+        username: str,
+        password: str,
+        protocol: str = "https",
+        session: requests.Session = None,
+    ):
+        self.ip_address = ip_address
+        self.username = username
+        self.password = password
+        self.protocol = protocol
+        # A shared session reuses TLS connections across requests
+        self.session = session if session is not None else requests
+
+    def _build_url(self, command: str) -> str:
+        """Builds the request URL for the camera API."""
+        return f"{self.protocol}://{self.ip_address}/cgi-bin/api.cgi?cmd={command}&user={self.username}&password={self.password}&channel=0"
+
+    def move_camera(self, operation: str, speed: int = 10):
+        """Moves the camera in a given direction."""
+        url = self._build_url("PtzCtrl")
+        data = [
+            {
+                "cmd": "PtzCtrl",
+                "action": 0,
+                "param": {"channel": 0, "op": operation, "speed": speed},
+            }
+        ]
+        response = self.session.post(url, json=data, verify=False)
+        return response.json() if response.status_code == 200 else None
+
+    def stop_camera(self):
+        """Stops the camera movement."""
+        return self.move_camera("Stop")
+
+    def zoom(self, position: int):
+        """Adjusts the zoom level of the camera."""
+        url = self._build_url("StartZoomFocus")
+        data = [
+            {
+                "cmd": "StartZoomFocus",
+                "action": 0,
+                "param": {
+                    "ZoomFocus": {"channel": 0, "pos": position, "op": "ZoomPos"}
+                },
+            }
+        ]
+        response = self.session.post(url, json=data, verify=False)
+        return response.json() if response.status_code == 200 else None
+
+    def get_capabilities(self):
+        """Fetches abilities, zoom/focus ranges and encoding options in a single request."""
+        url = self._build_url("GetAbility")
+        data = [
+            {
+                "cmd": "GetAbility",
+                "action": 0,
+                "param": {"User": {"userName": self.username}},
+            },
+            {"cmd": "GetZoomFocus", "action": 1, "param": {"channel": 0}},
+            {"cmd": "GetEnc", "action": 1, "param": {"channel": 0}},
+        ]
+        response = self.session.post(url, json=data, verify=False, timeout=10)
+        return response.json() if response.status_code == 200 else None
+
+    def get_device_info(self, timeout: float = 10):
+        """Fetches the device information (model, firmware...), used as a reachability probe."""
+        url = self._build_url("GetDevInfo")
+        data = [{"cmd": "GetDevInfo", "action": 0, "param": {}}]
+        response = self.session.post(url, json=data, verify=False, timeout=timeout)
+        return response.json() if response.status_code == 200 else None
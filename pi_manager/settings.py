@@ -0,0 +1,84 @@
+import json
+import os
+from functools import lru_cache
+
+import yaml
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """Loads the config files and environment on first use and caches the result."""
+    # Load ffmpeg config (YAML)
+    with open("ffmpeg_config.yaml", "r") as file:
+        ffmpeg_config = yaml.safe_load(file)
+
+    srt_settings = ffmpeg_config["srt_settings"]
+    profiles = ffmpeg_config["profiles"]
+
+    # Load environment variables
+    load_dotenv()
+
+    cam_user = os.getenv("CAM_USER")
+    cam_pwd = os.getenv("CAM_PWD")
+    mediamtx_server_ip = os.getenv("MEDIAMTX_SERVER_IP")
+    stream_name = os.getenv("STREAM_NAME")
+
+    # Load camera credentials
+    with open("credentials.json", "r") as file:
+        credentials = json.load(file)
+
+    # Build cameras dictionary
+    cameras = {
+        cam_id: {"ip": ip, "username": cam_user, "password": cam_pwd}
+        for cam_id, ip in credentials["cameras"].items()
+    }
+
+    # Build streams dictionary using config values
+    output_url = (
+        f"srt://{mediamtx_server_ip}:{srt_settings['port_start']}?"
+        f"pkt_size={srt_settings['pkt_size']}&"
+        f"mode={srt_settings['mode']}&"
+        f"latency={srt_settings['latency']}&"
+        f"streamid={srt_settings['streamid_prefix']}:{stream_name}"
+    )
+    streams = {
+        cam_id: {
+            "input_urls": {
+                name: f"rtsp://{cam_user}:{cam_pwd}@{cam_info['ip']}/{profile['input_path']}"
+                for name, profile in profiles.items()
+            },
+            "output_url": output_url,
+            "port": srt_settings["port_start"],
+        }
+        for cam_id, cam_info in cameras.items()
+    }
+
+    # The mosaic tiles several cameras into one stream, sent like a single camera's
+    mosaic = ffmpeg_config.get("mosaic")
+    if mosaic:
+        mosaic = {
+            **mosaic,
+            "cameras": [
+                cam_id for cam_id in mosaic.get("cameras") or cameras if cam_id in cameras
+            ],
+            "profile": mosaic.get("profile") or ffmpeg_config["default_profile"],
+            "output_url": output_url,
+            "port": srt_settings["port_start"],
+        }
+
+    return {
+        "srt_settings": srt_settings,
+        "ffmpeg_params": ffmpeg_config["ffmpeg_params"],
+        "profiles": profiles,
+        "default_profile": ffmpeg_config["default_profile"],
+        "frame_tap": ffmpeg_config.get("frame_tap", {"enabled": False}),
+        "latency_probe": ffmpeg_config.get("latency_probe", {"enabled": False}),
+        "governor": ffmpeg_config.get("governor", {"enabled": False}),
+        "logging": ffmpeg_config.get("logging", {}),
+        "cameras": cameras,
+        "streams": streams,
+        "mosaic": mosaic,
+        # On tmpfs: the PIDs it records do not survive a reboot anyway
+        "state_db": os.getenv("STREAM_STATE_DB", "/dev/shm/pi_manager/stream_state.db"),
+    }
@@ -0,0 +1,201 @@
+import math
+
+
+def build_ffmpeg_command(
+    input_url: str,
+    output_url: str,
+    ffmpeg_params: dict,
+    frame_tap: dict = None,
+    profile: dict = None,
+    latency_probe: dict = None,
+):
+    """Builds the ffmpeg command dynamically based on config.
+
+    `profile` overrides the bitrate and framerate of `ffmpeg_params` and may
+    scale the output. With `frame_tap`, the decoded input is also written to
+    stdout as downsampled raw frames, so the camera stream is only pulled and
+    decoded once. With `latency_probe`, output timestamps carry the wallclock
+    time at which each frame was received, see `latency_probe.py`.
+    """
+    probing = bool(latency_probe and latency_probe["enabled"])
+    if profile:
+        ffmpeg_params = {
+            **ffmpeg_params,
+            "bitrate": profile["bitrate"],
+            "framerate": profile["framerate"],
+        }
+
+    # Errors and machine-readable progress (used to detect a working pipeline) on stderr
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats"]
+    command += ["-progress", "pipe:2"]
+
+    if ffmpeg_params["discardcorrupt"]:
+        command += ["-fflags", "discardcorrupt+nobuffer"]
+    if ffmpeg_params["low_delay"]:
+        command += ["-flags", "low_delay"]
+
+    command += ["-rtsp_transport", ffmpeg_params["rtsp_transport"]]
+    if probing:
+        # Stamp input packets with the wallclock and keep those timestamps to the output
+        command += ["-use_wallclock_as_timestamps", "1", "-copyts"]
+
+    command += [
+        "-i",
+        input_url,
+        "-c:v",
+        ffmpeg_params["video_codec"],
+        "-bf",
+        str(ffmpeg_params["b_frames"]),
+        "-b:v",
+        ffmpeg_params["bitrate"],
+        "-r",
+        str(ffmpeg_params["framerate"]),
+        "-preset",
+        ffmpeg_params["preset"],
+        "-tune",
+        ffmpeg_params["tune"],
+    ]
+
+    filters = []
+    if profile and profile.get("scale"):
+        filters.append(f"scale={profile['scale']}")
+    if probing and latency_probe["overlay"]:
+        # Visible UTC wallclock, for glass-to-glass checks against a reference clock
+        filters.append(
+            "drawtext=text='%{pts\\:gmtime\\:0\\:%T}':"
+            "x=10:y=10:fontsize=24:fontcolor=white:box=1:boxcolor=black"
+        )
+    if filters:
+        command += ["-vf", ",".join(filters)]
+
+    if ffmpeg_params["audio_disabled"]:
+        command.append("-an")
+
+    if probing:
+        # The default 0.7s mux delay would be counted as network latency
+        command += ["-muxdelay", "0", "-muxpreload", "0"]
+
+    command += ["-f", ffmpeg_params["output_format"], output_url]
+
+    if frame_tap and frame_tap["enabled"]:
+        command += [
+            "-map",
+            "0:v",
+            "-vf",
+            f"fps={frame_tap['fps']},scale={frame_tap['width']}:{frame_tap['height']}",
+            "-pix_fmt",
+            frame_tap["pix_fmt"],
+            "-f",
+            "rawvideo",
+            "pipe:1",
+        ]
+    return command
+
+
+def mosaic_columns(count: int, layout: str, columns: int = None) -> int:
+    """Tiles per row of a mosaic: one row, one column, or a grid (near-square unless `columns`)."""
+    if layout == "horizontal":
+        return count
+    if layout == "vertical":
+        return 1
+    return min(count, columns or math.ceil(math.sqrt(count)))
+
+
+def build_mosaic_command(
+    input_urls: list,
+    output_url: str,
+    ffmpeg_params: dict,
+    mosaic: dict,
+    frame_tap: dict = None,
+    tap_outputs: list = (),
+):
+    """Builds an ffmpeg command tiling several camera streams into a single encode.
+
+    Every input is sampled at `mosaic["framerate"]`, fitted (letterboxed) into
+    a `tile_width` x `tile_height` tile and placed by `layout`; the mosaic is
+    encoded once, capped at `mosaic["bitrate"]` in total, and sent to one output.
+    With `frame_tap`, each input is also written as raw frames to the matching
+    entry of `tap_outputs` (e.g. `pipe:3`), so detection keeps every camera.
+    """
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats"]
+    command += ["-progress", "pipe:2"]
+
+    for input_url in input_urls:
+        if ffmpeg_params["discardcorrupt"]:
+            command += ["-fflags", "discardcorrupt+nobuffer"]
+        if ffmpeg_params["low_delay"]:
+            command += ["-flags", "low_delay"]
+        command += ["-rtsp_transport", ffmpeg_params["rtsp_transport"], "-i", input_url]
+
+    width, height = mosaic["tile_width"], mosaic["tile_height"]
+    framerate = mosaic["framerate"]
+    count = len(input_urls)
+    columns = mosaic_columns(count, mosaic["layout"], mosaic.get("columns"))
+
+    tapping = bool(frame_tap and frame_tap["enabled"] and tap_outputs)
+    filters = []
+    if tapping:
+        for i in range(count):
+            filters.append(f"[{i}:v]split=2[in{i}][raw{i}]")
+            filters.append(
+                f"[raw{i}]fps={frame_tap['fps']},"
+                f"scale={frame_tap['width']}:{frame_tap['height']}[tap{i}]"
+            )
+    sources = [f"[in{i}]" if tapping else f"[{i}:v]" for i in range(count)]
+
+    # Cameras start at different times: align them on their first frame
+    filters += [
+        f"{sources[i]}setpts=PTS-STARTPTS,fps={framerate},"
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+        f"[{'v' if count == 1 else f't{i}'}]"
+        for i in range(count)
+    ]
+    if count > 1:
+        positions = "|".join(
+            f"{(i % columns) * width}_{(i // columns) * height}" for i in range(count)
+        )
+        tiles = "".join(f"[t{i}]" for i in range(count))
+        # Cells of an incomplete last row stay black
+        filters.append(f"{tiles}xstack=inputs={count}:layout={positions}:fill=black[v]")
+
+    bitrate = mosaic["bitrate"]
+    command += [
+        "-filter_complex",
+        ";".join(filters),
+        "-map",
+        "[v]",
+        "-c:v",
+        ffmpeg_params["video_codec"],
+        "-bf",
+        str(ffmpeg_params["b_frames"]),
+        # A hard cap over a one-second window, the uplink has no headroom
+        "-b:v",
+        bitrate,
+        "-maxrate",
+        bitrate,
+        "-bufsize",
+        bitrate,
+        "-r",
+        str(framerate),
+        "-preset",
+        ffmpeg_params["preset"],
+        "-tune",
+        ffmpeg_params["tune"],
+        "-f",
+        ffmpeg_params["output_format"],
+        output_url,
+    ]
+
+    if tapping:
+        for i, tap_output in enumerate(tap_outputs):
+            command += [
+                "-map",
+                f"[tap{i}]",
+                "-pix_fmt",
+                frame_tap["pix_fmt"],
+                "-f",
+                "rawvideo",
+                tap_output,
+            ]
+    return command
@@ -0,0 +1,206 @@
+import asyncio
+import fcntl
+import json
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+
+class StreamStateStore:
+    """SQLite-backed record of running streams, shared by every API worker.
+
+    Each row stores the camera being streamed, the FFmpeg PID (also its process
+    group ID), the SRT port, the PID of the worker that owns the child and the
+    deadline after which the stream is stopped for inactivity.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock_path = f"{db_path}.lock"
+        self._local_lock = asyncio.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS streams (
+                    camera_id TEXT PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    port INTEGER,
+                    owner_pid INTEGER NOT NULL,
+                    started_at REAL NOT NULL,
+                    deadline REAL NOT NULL,
+                    profile TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shared_values (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(streams)")]
+            if "profile" not in columns:
+                # Database created before quality profiles existed
+                conn.execute("ALTER TABLE streams ADD COLUMN profile TEXT")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a short-lived connection; write transactions take the lock up front."""
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # WAL stays consistent without an fsync per commit, which spares the SD card
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @asynccontextmanager
+    async def exclusive(self):
+        """Cross-process lock held while streams are started or stopped.
+
+        Tasks of this worker queue on an asyncio lock first, so at most one executor
+        thread blocks in flock; the holder still gets threads for its store calls.
+        """
+        async with self._local_lock:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the descriptor releases the lock
+                os.close(fd)
+
+    def add(
+        self,
+        camera_id: str,
+        pid: int,
+        port: int,
+        idle_timeout: float,
+        profile: str,
+        deadline: float = None,
+    ):
+        """Records a newly started stream owned by the current worker, replacing any previous one.
+
+        The inactivity deadline is `idle_timeout` from now, unless `deadline` is given
+        (a restarted stream keeps the one of the process it replaces).
+        """
+        now = time.time()
+        if deadline is None:
+            deadline = now + idle_timeout
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO streams"
+                " (camera_id, pid, port, owner_pid, started_at, deadline, profile)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (camera_id, pid, port, os.getpid(), now, deadline, profile),
+            )
+
+    def list_streams(self):
+        """Returns every recorded stream as a dict."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM streams ORDER BY started_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def touch(self, idle_timeout: float):
+        """Pushes back the inactivity deadline of every stream."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE streams SET deadline = ?", (time.time() + idle_timeout,))
+
+    def remove(self, camera_id: str, pid: int):
+        """Forgets a stream, unless it has been replaced by a newer process meanwhile."""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM streams WHERE camera_id = ? AND pid = ?", (camera_id, pid)
+            )
+
+    def get(self, camera_id: str):
+        """Returns the stream of a camera as a dict, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM streams WHERE camera_id = ?", (camera_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_value(self, key: str, default=None):
+        """Returns a JSON value shared between workers, or `default`."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM shared_values WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_value(self, key: str, value):
+        """Stores a JSON-serializable value shared between workers."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_values VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def recent_values(self, prefix: str, max_age: float):
+        """Returns the shared values whose key starts with `prefix`, set within `max_age` seconds."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT value FROM shared_values"
+                " WHERE substr(key, 1, ?) = ? AND updated_at >= ?",
+                (len(prefix), prefix, time.time() - max_age),
+            ).fetchall()
+        return [json.loads(row["value"]) for row in rows]
+
+    def claim(self, role: str, ttl: float) -> bool:
+        """Takes or renews a role held by one worker at a time; returns whether this worker holds it.
+
+        The role lapses when its holder has not renewed it for `ttl` seconds, e.g. after a crash.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value, updated_at FROM shared_values WHERE key = ?", (role,)
+            ).fetchone()
+            held_by_other = row and json.loads(row["value"]) != os.getpid()
+            if held_by_other and row["updated_at"] >= now - ttl:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_values VALUES (?, ?, ?)",
+                (role, json.dumps(os.getpid()), now),
+            )
+        return True
+
+    def pop_all(self):
+        """Removes and returns every stream, so exactly one caller gets to stop it."""
+        return self._pop("SELECT * FROM streams", ())
+
+    def pop_expired(self):
+        """Removes and returns streams whose inactivity deadline has passed."""
+        return self._pop("SELECT * FROM streams WHERE deadline < ?", (time.time(),))
+
+    def pop_owned(self, owner_pid: int):
+        """Removes and returns the streams whose FFmpeg child belongs to `owner_pid`."""
+        return self._pop("SELECT * FROM streams WHERE owner_pid = ?", (owner_pid,))
+
+    def _pop(self, query: str, params: tuple):
+        with self._transaction() as conn:
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+            conn.executemany(
+                "DELETE FROM streams WHERE camera_id = ?",
+                [(row["camera_id"],) for row in rows],
+            )
+        return rows
@@ -0,0 +1,53 @@
+import asyncio
+
+import frame_tap
+from frame_tap import FrameTapReader, pump_frames
+
+TAP = {"width": 4, "height": 2, "pix_fmt": "gray", "slots": 2}
+
+
+def drain(chunks, tap_settings):
+    """Runs the pump over `chunks` and returns whether it read the pipe up to EOF."""
+
+    async def main():
+        stdout = asyncio.StreamReader()
+        for chunk in chunks:
+            stdout.feed_data(chunk)
+        stdout.feed_eof()
+        await pump_frames("test_drain", stdout, tap_settings)
+        return stdout.at_eof()
+
+    return asyncio.run(main())
+
+
+def test_frames_reach_the_segment_once_published():
+    async def main():
+        publish = asyncio.Event()
+        stdout = asyncio.StreamReader()
+        pump = asyncio.create_task(pump_frames("test_pump", stdout, TAP, publish))
+        stdout.feed_data(bytes([1] * 8))  # Still on trial: dropped
+        await asyncio.sleep(0)
+        publish.set()
+        stdout.feed_data(bytes([2] * 8))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        reader = FrameTapReader("test_pump")
+        seq, _, frame = reader.latest()
+        assert seq == 1 and frame.max() == 2
+        reader.close()
+        stdout.feed_eof()
+        await pump
+
+    asyncio.run(main())
+
+
+def test_failed_tap_keeps_draining_the_pipe(monkeypatch):
+    def no_space(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(frame_tap, "FrameTapWriter", no_space)
+    assert drain([bytes(8)] * 3 + [bytes(5)], TAP)
+
+
+def test_bad_pix_fmt_keeps_draining_the_pipe():
+    assert drain([bytes(100)], {**TAP, "pix_fmt": "yuv420p"})
@@ -0,0 +1,139 @@
+import pytest
+
+from governor import EncodeGovernor, apply_overrides
+
+CONFIG = {
+    "sustain": 2,
+    "recover": 3,
+    "min_dwell": 30,
+    "temp_high": 75,
+    "temp_low": 65,
+    "cpu_high": 0.9,
+    "cpu_low": 0.6,
+    "speed_low": 0.9,
+    "speed_ok": 0.98,
+    "levels": [
+        {"preset": "ultrafast"},
+        {"preset": "ultrafast", "framerate": 5, "scale": "480:270"},
+    ],
+}
+
+
+@pytest.fixture
+def fake_files(tmp_path):
+    """Writes fake /proc and /sys files and returns a function updating them."""
+    paths = {
+        "stat": tmp_path / "stat",
+        "temperature": tmp_path / "temp",
+        "throttled": tmp_path / "get_throttled",
+    }
+
+    def write(busy=0, idle=100, temperature=50000, throttled="0x0"):
+        # "cpu  user nice system idle iowait irq softirq steal"
+        paths["stat"].write_text(f"cpu  {busy} 0 0 {idle} 0 0 0 0\ncpu0 0 0 0 0\n")
+        paths["temperature"].write_text(f"{temperature}\n")
+        paths["throttled"].write_text(f"{throttled}\n")
+
+    write()
+    return {name: str(path) for name, path in paths.items()}, write
+
+
+def make_governor(paths):
+    return EncodeGovernor({**CONFIG, "paths": paths})
+
+
+def test_sample_reads_fake_files(fake_files):
+    paths, write = fake_files
+    governor = make_governor(paths)
+
+    first = governor.sample()
+    # CPU usage needs two samples of /proc/stat
+    assert first["cpu_usage"] is None
+    assert first["temperature_c"] == 50
+    assert first["throttled"] == 0
+
+    write(busy=90, idle=110, temperature=80500, throttled="0x6")
+    metrics = governor.sample(encoder_speeds=[1.0, 0.8, None])
+    assert metrics["cpu_usage"] == pytest.approx(0.9)
+    assert metrics["temperature_c"] == 80.5
+    assert metrics["throttled"] == 0x6
+    assert metrics["encoder_speed"] == 0.8
+
+
+def test_missing_files_give_none(tmp_path):
+    governor = make_governor(
+        {name: str(tmp_path / "missing") for name in ("stat", "temperature", "throttled")}
+    )
+    metrics = governor.sample()
+    assert metrics["cpu_usage"] is None
+    assert metrics["temperature_c"] is None
+    assert metrics["throttled"] is None
+    assert governor.decide(metrics, 0, 0, 100) == 0
+
+
+def test_sustained_pressure_steps_down_once_per_dwell(fake_files):
+    paths, write = fake_files
+    governor = make_governor(paths)
+    write(temperature=80000)
+
+    assert governor.decide(governor.sample(), 0, 0, 100) == 0
+    assert governor.decide(governor.sample(), 0, 0, 101) == 1
+    # Still hot, but the previous change is too recent
+    assert governor.decide(governor.sample(), 1, 101, 110) == 1
+    assert governor.decide(governor.sample(), 1, 101, 140) == 2
+    # Already at the last level
+    for now in (200, 201, 202):
+        assert governor.decide(governor.sample(), 2, 140, now) == 2
+
+
+def test_recovery_needs_every_signal_under_its_low_threshold(fake_files):
+    paths, write = fake_files
+    governor = make_governor(paths)
+
+    # Between temp_low and temp_high: neither pressure nor clear, the level holds
+    write(temperature=70000)
+    for now in range(100, 110):
+        assert governor.decide(governor.sample(), 1, 0, now) == 1
+
+    write(temperature=60000)
+    assert governor.decide(governor.sample(), 1, 0, 200) == 1
+    assert governor.decide(governor.sample(), 1, 0, 201) == 1
+    assert governor.decide(governor.sample(), 1, 0, 202) == 0
+
+
+def test_throttling_and_slow_encoder_count_as_pressure(fake_files):
+    paths, write = fake_files
+    governor = make_governor(paths)
+
+    write(throttled="0x50000")  # Throttled in the past only
+    governor.decide(governor.sample(), 0, 0, 100)
+    assert governor.last_reasons == []
+
+    write(throttled="0x4")
+    governor.decide(governor.sample(encoder_speeds=[0.5]), 0, 0, 101)
+    assert governor.last_reasons == ["throttled 0x4", "encoder speed 0.50x"]
+
+
+def test_overrides_degrade_a_profile():
+    governor = EncodeGovernor(CONFIG)
+    assert governor.overrides(0) == {}
+    assert governor.overrides(5) == CONFIG["levels"][-1]
+
+    ffmpeg_params, profile = apply_overrides(
+        {"preset": "veryfast"},
+        {"framerate": 10, "scale": None},
+        governor.overrides(2),
+    )
+    assert ffmpeg_params == {"preset": "ultrafast"}
+    assert profile == {"framerate": 5, "scale": "480:270"}
+
+
+def test_scale_override_shrinks_mosaic_tiles():
+    mosaic = {"framerate": 5, "tile_width": 640, "tile_height": 360}
+    _, degraded = apply_overrides({}, mosaic, {"scale": "480:270"})
+    assert (degraded["tile_width"], degraded["tile_height"]) == (480, 270)
+
+    # Never upscales, and -1 keeps that dimension
+    _, degraded = apply_overrides({}, mosaic, {"scale": "1280:-1"})
+    assert (degraded["tile_width"], degraded["tile_height"]) == (640, 360)
+    assert mosaic["tile_width"] == 640
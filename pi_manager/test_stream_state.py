@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stream_state import StreamStateStore
+
+
+def test_exclusive_waiters_leave_threads_to_the_holder(tmp_path):
+    store = StreamStateStore(str(tmp_path / "state.db"))
+
+    async def start(camera_id):
+        async with store.exclusive():
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(store.add, camera_id, 1, 8890, 60, "low")
+
+    async def main():
+        # Fewer executor threads than waiting tasks, like a busy worker on a Pi
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(2))
+        await asyncio.wait_for(
+            asyncio.gather(*(start(f"cam{i}") for i in range(6))), timeout=5
+        )
+
+    asyncio.run(main())
+    assert len(store.list_streams()) == 6
+
+
+def test_pop_expired_keeps_live_streams(tmp_path):
+    store = StreamStateStore(str(tmp_path / "state.db"))
+    store.add("cam1", 1, 8890, 60, "low")
+    store.add("cam2", 2, 8891, 60, "low", deadline=0)
+
+    assert [row["camera_id"] for row in store.pop_expired()] == ["cam2"]
+    assert [row["camera_id"] for row in store.list_streams()] == ["cam1"]
+
+
+def test_claim_is_held_by_one_worker_until_it_lapses(tmp_path):
+    store = StreamStateStore(str(tmp_path / "state.db"))
+    assert store.claim("governor_worker", ttl=60)
+    assert store.claim("governor_worker", ttl=60)  # Renewed by its holder
+
+    store.set_value("governor_worker", os.getpid() + 1)  # Another worker took it
+    assert not store.claim("governor_worker", ttl=60)
+    time.sleep(0.01)
+    assert store.claim("governor_worker", ttl=0.005)
+
+
+def test_recent_values_skip_stale_workers(tmp_path):
+    store = StreamStateStore(str(tmp_path / "state.db"))
+    store.set_value("encoder_speeds:1", [0.8])
+    time.sleep(0.05)
+    store.set_value("encoder_speeds:2", [1.0, None])
+    store.set_value("governor", {"level": 1})
+
+    assert store.recent_values("encoder_speeds:", max_age=0.04) == [[1.0, None]]
+    assert len(store.recent_values("encoder_speeds:", max_age=60)) == 2
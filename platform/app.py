@@ -1,31 +1,56 @@
 import dash
 import dash_bootstrap_components as dbc
 import requests
-from dash import Input, Output, State, dcc, html
+from dash import Input, Output, State, ctx, dcc, html
+from dash.fingerprint import check_fingerprint
 import dash_leaflet as dl
 from dotenv import load_dotenv
+from flask import Flask, request
+import logging
 import os
-from utils import build_vision_polygon
+from tile_cache import MAX_CACHE_MB, UPSTREAM_URL, TileCache, register_tile_route
+from utils import build_vision_polygon, scale_to_range
 
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 CAM_USER = os.getenv("CAM_USER")
 CAM_PWD = os.getenv("CAM_PWD")
 MEDIAMTX_SERVER_IP = os.getenv("MEDIAMTX_SERVER_IP")
 STREAM_NAME = os.getenv("STREAM_NAME")
 
+ASSETS_DIR = os.getenv(
+    "ASSETS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+)
+# Bundled by fetch_assets.py; the CDN is only used until they are
+BOOTSTRAP_CSS = "bootstrap.min.css"
+LOGO = "logo_letters_orange.png"
 pyro_logo = "https://pyronear.org/img/logo_letters_orange.png"
+STATIC_MAX_AGE = 365 * 24 * 3600  # Fingerprinted files never change under the same URL
+# Optional local cache of map tiles, for operator rooms with a slow or no uplink
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR")
+TILE_CACHE_MB = int(os.getenv("TILE_CACHE_MB", MAX_CACHE_MB))
+TILE_UPSTREAM_URL = os.getenv("TILE_UPSTREAM_URL", UPSTREAM_URL)
 TARGET_IP = "192.168.1.28"
 STREAM_URL = f"{MEDIAMTX_SERVER_IP}:8889/{STREAM_NAME}"
 FASTAPI_URL = f"http://{TARGET_IP}:8000"
 CAMERAS = {"Camera 1": "cam1", "Camera 2": "cam2"}
+QUALITY_PROFILES = {
+    "Low quality": "low",
+    "Medium quality": "medium",
+    "High quality": "high",
+}
+DEFAULT_PROFILE = "low"
 
 site_lat = 48.426746125557
 site_lon = 2.71087590966019
 azimuth = 45
 opening_angle = 54
 dist_km = 15
+# Optional elevation raster (.npy + .json sidecar, or GeoTIFF) to clip the vision cone by terrain
+DEM_PATH = os.getenv("DEM_PATH")
+mast_height = 20
 
 
 def Navbar():
@@ -39,7 +64,59 @@ def Navbar():
     )
 
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+server = Flask(__name__)
+# Brotli when the browser supports it, gzip otherwise
+server.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+# Files in assets/ are streamed; browsers only offer br over HTTPS, so gzip must stay
+server.config["COMPRESS_ALGORITHM_STREAMING"] = ["br", "gzip"]
+local_bootstrap = os.path.exists(os.path.join(ASSETS_DIR, BOOTSTRAP_CSS))
+missing_assets = [
+    name for name in (BOOTSTRAP_CSS, LOGO) if not os.path.exists(os.path.join(ASSETS_DIR, name))
+]
+if missing_assets:
+    # The panel still loads, but its first paint waits on the CDN (or fails offline)
+    logger.warning(
+        f"{', '.join(missing_assets)} missing from {ASSETS_DIR}, loaded from the CDN instead;"
+        " run fetch_assets.py to bundle them"
+    )
+app = dash.Dash(
+    __name__,
+    server=server,
+    assets_folder=ASSETS_DIR,
+    # CSS files in assets/ are included automatically
+    external_stylesheets=[] if local_bootstrap else [dbc.themes.BOOTSTRAP],
+    serve_locally=True,
+    compress=True,
+)
+if os.path.exists(os.path.join(ASSETS_DIR, LOGO)):
+    logo_mtime = int(os.path.getmtime(os.path.join(ASSETS_DIR, LOGO)))
+    pyro_logo = f"{app.get_asset_url(LOGO)}?m={logo_mtime}"
+
+
+@server.after_request
+def cache_static_files(response):
+    """Lets browsers keep versioned assets and component bundles without revalidating."""
+    path = request.path
+    versioned = (
+        path.startswith("/assets/") and "m" in request.args
+    ) or (
+        path.startswith("/_dash-component-suites/")
+        and check_fingerprint(path.split("/")[-1])[1]
+    )
+    if versioned and response.status_code == 200:
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+tile_layer = dl.TileLayer()
+if TILE_CACHE_DIR:
+    tile_cache = TileCache(
+        TILE_CACHE_DIR, TILE_CACHE_MB * 1024 * 1024, upstream_url=TILE_UPSTREAM_URL
+    )
+    tile_layer = dl.TileLayer(url=register_tile_route(server, tile_cache))
 
 # Styles
 button_style = {
@@ -343,12 +420,35 @@ app.layout = html.Div(
                             justify="center",
                             className="mb-4",
                         ),
+                        # Stream quality, streams always start on the cheapest profile
+                        html.Div(
+                            dcc.Dropdown(
+                                id="quality-select",
+                                options=[
+                                    {"label": label, "value": profile}
+                                    for label, profile in QUALITY_PROFILES.items()
+                                ],
+                                value=DEFAULT_PROFILE,
+                                clearable=False,
+                                style={
+                                    "border": "none",
+                                    "borderRadius": "8px",
+                                    "backgroundColor": "white",
+                                    "width": "100%",
+                                },
+                            ),
+                            style={
+                                "border": "2px solid #098386",
+                                "borderRadius": "10px",
+                                "marginBottom": "16px",
+                            },
+                        ),
                         # Updated map with vision cone
                         dl.Map(
                             center=[site_lat, site_lon],
                             zoom=10,
                             children=[
-                                dl.TileLayer(),
+                                tile_layer,
                                 dl.LayerGroup(
                                     id="vision-layer",
                                     children=[
@@ -358,6 +458,8 @@ app.layout = html.Div(
                                             azimuth=azimuth,
                                             opening_angle=opening_angle,
                                             dist_km=dist_km,
+                                            dem_path=DEM_PATH,
+                                            mast_height=mast_height,
                                         )[0]
                                     ],
                                 ),
@@ -383,6 +485,9 @@ app.layout = html.Div(
         ),
         dcc.Interval(id="stream-timer", interval=1000, n_intervals=0, disabled=True),
         dcc.Store(id="detection-status", data="stopped"),
+        # Ranges reported by the API (its own defaults until the camera answers)
+        dcc.Store(id="camera-capabilities", data=None),
+        dcc.Interval(id="health-timer", interval=10000, n_intervals=0),
 
 
     ],
@@ -403,11 +508,63 @@ app.index_string = """
 def send_api_request(endpoint: str):
     try:
         response = requests.post(f"{FASTAPI_URL}{endpoint}")
-        return response.json().get("message", "Unknown response")
+        answer = response.json()
+        return answer.get("message") or answer.get("error") or "Unknown response"
     except requests.exceptions.RequestException:
         return "Error: Could not reach API server."
 
 
+def get_api_json(endpoint: str):
+    try:
+        response = requests.get(f"{FASTAPI_URL}{endpoint}", timeout=10)
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+@app.callback(
+    Output("camera-select", "options"),
+    Input("health-timer", "n_intervals"),
+)
+def update_camera_options(n):
+    # /health only returns cached states, so this never waits on a camera
+    health = get_api_json("/health") or {}
+    options = []
+    for name, cam_id in CAMERAS.items():
+        offline = health.get(cam_id, {}).get("state") == "offline"
+        options.append(
+            {
+                "label": f"{name} (offline)" if offline else name,
+                "value": cam_id,
+                "disabled": offline,
+            }
+        )
+    return options
+
+
+@app.callback(
+    Output("camera-capabilities", "data"),
+    Input("camera-select", "value"),
+    Input("health-timer", "n_intervals"),
+    State("camera-capabilities", "data"),
+)
+def load_capabilities(camera_id, n, current):
+    # Until the camera itself has answered, ask again on every health tick
+    if (
+        ctx.triggered_id == "health-timer"
+        and current
+        and current.get("camera_id") == camera_id
+        and current.get("source") == "camera"
+    ):
+        return dash.no_update
+    capabilities = get_api_json(f"/capabilities/{camera_id}")
+    if not capabilities or "error" in capabilities:
+        # API unreachable: keep what we know of this camera, never another one's ranges
+        same_camera = current and current.get("camera_id") == camera_id
+        return dash.no_update if same_camera else None
+    return capabilities
+
+
 # Main Callback
 @app.callback(
     Output("output-message", "children"),
@@ -420,10 +577,13 @@ def send_api_request(endpoint: str):
         Input("move-right", "n_clicks"),
         Input("stop-move", "n_clicks"),
         Input("zoom-input", "value"),
+        Input("quality-select", "value"),
     ],
     [
         State("camera-select", "value"),
         State("speed-input", "value"),
+        State("camera-capabilities", "data"),
+        State("detection-status", "data"),
     ],
 )
 def control_camera(
@@ -435,8 +595,11 @@ def control_camera(
     right,
     stop,
     zoom_level,
+    quality,
     camera_id,
     move_speed,
+    capabilities,
+    detection_status,
 ):
     ctx = dash.callback_context
     if not ctx.triggered:
@@ -452,22 +615,34 @@ def control_camera(
         "stop-move": "Stop",
     }
 
+    if button_id in list(direction_map) + ["zoom-input"] and (
+        not capabilities or capabilities.get("camera_id") != camera_id
+    ):
+        capabilities = get_api_json(f"/capabilities/{camera_id}")
+        if not capabilities or "error" in capabilities:
+            return "Error: Could not reach API server."
+
     if button_id == "start-stream":
-        return send_api_request(f"/start_stream/{camera_id}")
+        # Started directly in the selected profile, no switch right after
+        return send_api_request(f"/start_stream/{camera_id}?profile={quality}")
     elif button_id == "stop-stream":
         return send_api_request("/stop_stream")
     elif button_id in direction_map:
         direction = direction_map[button_id]
         if direction != "Stop":
-            true_speed = int(move_speed / 10)
+            true_speed = scale_to_range(move_speed, capabilities["speed"])
             return send_api_request(f"/move/{camera_id}/{direction}/{true_speed}")
         else:
             return send_api_request(f"/stop/{camera_id}")
     # Inside your control_camera callback
     elif button_id == "zoom-input":
-        # Convert 0-100 scale to 0-41 scale
-        true_zoom = int(zoom_level * 41 / 100)
+        # Convert 0-100 scale to the camera's zoom range
+        true_zoom = scale_to_range(zoom_level, capabilities["zoom"])
         return send_api_request(f"/zoom/{camera_id}/{true_zoom}")
+    elif button_id == "quality-select":
+        if detection_status != "running":
+            return f"Quality {quality} will be used when the stream starts."
+        return send_api_request(f"/stream_profile/{camera_id}/{quality}")
 
 
     return ""
@@ -516,7 +691,7 @@ def update_status(n, detection_status):
                 "marginRight": "8px",
                 "fontWeight": "bold",
             }),
-            html.Span(f"Levée de doute en cours, la détection n'est plus active depuis {timer_text}")
+            html.Span(f"Levée de doute en cours depuis {timer_text}, la détection reste active")
         ])
     else:
         return ""
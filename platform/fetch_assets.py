@@ -0,0 +1,30 @@
+"""Downloads the stylesheet and logo of the control panel into `assets/`.
+
+Run once on a machine with internet access, then deploy `assets/` with the
+app: Dash serves it locally and the panel no longer depends on any CDN.
+"""
+
+import os
+
+import dash_bootstrap_components as dbc
+import requests
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ASSETS = {
+    "bootstrap.min.css": dbc.themes.BOOTSTRAP,
+    "logo_letters_orange.png": "https://pyronear.org/img/logo_letters_orange.png",
+}
+
+
+def fetch_assets(assets_dir: str = ASSETS_DIR):
+    os.makedirs(assets_dir, exist_ok=True)
+    for name, url in ASSETS.items():
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(assets_dir, name), "wb") as file:
+            file.write(response.content)
+        print(f"{name}: {len(response.content)} bytes from {url}")
+
+
+if __name__ == "__main__":
+    fetch_assets()
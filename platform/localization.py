@@ -0,0 +1,255 @@
+from collections import defaultdict
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+MAX_RANGE_KM = 30  # Farthest distance at which a camera can see smoke
+MIN_CROSSING_ANGLE = 5  # Degrees; flatter intersections are too poorly conditioned
+CLUSTER_RADIUS_KM = 1.5  # Pair intersections closer than this are the same smoke
+ELLIPSE_SCALE = np.sqrt(5.991)  # Chi-square, 2 degrees of freedom, 95% confidence
+MAX_RESIDUAL_SIGMA = 3  # Observations farther than this from an estimate are dropped
+KM_PER_DEG = 111.2
+
+
+def to_unit_vectors(lats, lons):
+    """Converts latitudes/longitudes (degrees) to points on the unit sphere."""
+    lat = np.radians(lats)
+    lon = np.radians(lons)
+    return np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+def to_lat_lon(points):
+    """Converts points on (or near) the unit sphere back to latitudes/longitudes."""
+    points = points / np.linalg.norm(points, axis=-1, keepdims=True)
+    lats = np.degrees(np.arcsin(np.clip(points[..., 2], -1, 1)))
+    lons = np.degrees(np.arctan2(points[..., 1], points[..., 0]))
+    return lats, lons
+
+
+def tangent_basis(points):
+    """East and north unit vectors of the tangent planes at the given points."""
+    east = np.stack(
+        [-points[..., 1], points[..., 0], np.zeros(points.shape[:-1])], axis=-1
+    )
+    east /= np.linalg.norm(east, axis=-1, keepdims=True)
+    north = np.cross(points, east)
+    return east, north
+
+
+class GridIndex:
+    """Uniform grid over approximate kilometric coordinates of lat/lon points."""
+
+    def __init__(self, lats, lons, cell_km: float):
+        self.cell_km = cell_km
+        self.keys = self._keys(lats, lons)
+        self.cells = defaultdict(list)
+        for i, key in enumerate(map(tuple, self.keys)):
+            self.cells[key].append(i)
+
+    def _keys(self, lats, lons):
+        lats = np.asarray(lats, dtype=float)
+        x = np.asarray(lons) * KM_PER_DEG * np.cos(np.radians(lats))
+        y = lats * KM_PER_DEG
+        return np.floor(np.stack([x, y], axis=-1) / self.cell_km).astype(np.int64)
+
+    def neighbour_pairs(self):
+        """Index pairs (i < j) of points in the same or adjacent cells."""
+        pairs = []
+        for (cx, cy), members in self.cells.items():
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    others = self.cells.get((cx + dx, cy + dy))
+                    if others is None:
+                        continue
+                    for i in members:
+                        pairs.extend((i, j) for j in others if i < j)
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def intersect_pairs(observations, pairs, max_range_km, min_crossing_angle):
+    """Intersects the bearing great circles of observation pairs, vectorized.
+
+    Returns the intersection points (unit vectors) and the pairs they come from,
+    keeping only intersections in front of both cameras, within range of both
+    and crossing at a usable angle.
+    """
+    origins, directions = observations["points"], observations["directions"]
+    i, j = pairs[:, 0], pairs[:, 1]
+    normals = np.cross(origins, directions)
+    crossing = np.cross(normals[i], normals[j])
+    sin_angle = np.linalg.norm(crossing, axis=1)
+
+    # Two bearings from the same site only meet at the site itself
+    distinct = np.linalg.norm(origins[i] - origins[j], axis=1) * EARTH_RADIUS_M > 1
+    keep = distinct & (sin_angle >= np.sin(np.radians(min_crossing_angle)))
+    crossing = crossing[keep] / sin_angle[keep, None]
+    i, j = i[keep], j[keep]
+
+    # Each pair of great circles meets twice; take the side both cameras look at
+    front_i = np.einsum("ij,ij->i", crossing, directions[i])
+    front_j = np.einsum("ij,ij->i", crossing, directions[j])
+    crossing = np.where((front_i < 0)[:, None], -crossing, crossing)
+    same_side = np.sign(front_i) == np.sign(front_j)
+
+    max_angle = max_range_km * 1000 / EARTH_RADIUS_M
+    in_range = (np.einsum("ij,ij->i", crossing, origins[i]) >= np.cos(max_angle)) & (
+        np.einsum("ij,ij->i", crossing, origins[j]) >= np.cos(max_angle)
+    )
+
+    valid = same_side & in_range
+    return crossing[valid], np.stack([i[valid], j[valid]], axis=1)
+
+
+def cluster_points(points, cluster_km):
+    """Groups intersection points closer than `cluster_km` (single linkage). Returns labels."""
+    parent = np.arange(len(points))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    if len(points):
+        lats, lons = to_lat_lon(points)
+        grid = GridIndex(lats, lons, cluster_km)
+        pairs = grid.neighbour_pairs()
+        if len(pairs):
+            chord = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+            for a, b in pairs[chord * EARTH_RADIUS_M <= cluster_km * 1000]:
+                parent[find(a)] = find(b)
+    return np.array([find(k) for k in range(len(points))], dtype=np.int64)
+
+
+def solve_position(observations, members, guess):
+    """Weighted least-squares intersection of bearings in the tangent plane at `guess`.
+
+    Returns the estimate (unit vector), its 2x2 east/north covariance in square
+    metres and the normalized bearing residual of every member.
+    """
+    east, north = tangent_basis(guess)
+    origins = observations["points"][members]
+    # Site positions and bearing lines in the local plane, in metres
+    rel = origins - guess
+    sites = np.stack([rel @ east, rel @ north], axis=1) * EARTH_RADIUS_M
+    azimuths = np.radians(observations["azimuths"][members])
+    sigmas = np.radians(observations["uncertainties"][members])
+    normals = np.stack([np.cos(azimuths), -np.sin(azimuths)], axis=1)
+
+    estimate = np.zeros(2)
+    for _ in range(3):
+        # Angular uncertainty becomes a cross-track distance that grows with range
+        ranges = np.maximum(np.linalg.norm(sites - estimate, axis=1), 1.0)
+        weights = 1 / (sigmas * ranges) ** 2
+        normal_matrix = (normals * weights[:, None]).T @ normals
+        rhs = (normals * weights[:, None]).T @ np.einsum("ij,ij->i", normals, sites)
+        estimate = np.linalg.solve(normal_matrix, rhs)
+
+    covariance = np.linalg.inv(normal_matrix)
+    residuals = np.einsum("ij,ij->i", normals, estimate - sites) * np.sqrt(weights)
+    point = guess + (estimate[0] * east + estimate[1] * north) / EARTH_RADIUS_M
+    return point / np.linalg.norm(point), covariance, residuals
+
+
+def error_ellipse(covariance, scale=ELLIPSE_SCALE):
+    """Semi-axes (metres) and orientation (degrees clockwise from north) of the major axis."""
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    minor, major = scale * np.sqrt(np.maximum(eigenvalues, 0))
+    east, north = eigenvectors[:, 1]
+    return {
+        "semi_major_m": float(major),
+        "semi_minor_m": float(minor),
+        "orientation_deg": float(np.degrees(np.arctan2(east, north)) % 180),
+    }
+
+
+def ellipse_positions(point, ellipse, n_points=36):
+    """[lat, lon] outline of an error ellipse centred on a unit vector, for map drawing."""
+    east, north = tangent_basis(point)
+    t = np.linspace(0, 2 * np.pi, n_points, endpoint=False)
+    theta = np.radians(ellipse["orientation_deg"])
+    major = ellipse["semi_major_m"] * np.cos(t)
+    minor = ellipse["semi_minor_m"] * np.sin(t)
+    # Major axis along the orientation bearing, minor axis perpendicular to it
+    offset_east = major * np.sin(theta) + minor * np.cos(theta)
+    offset_north = major * np.cos(theta) - minor * np.sin(theta)
+    outline = (
+        point
+        + (offset_east[:, None] * east + offset_north[:, None] * north)
+        / EARTH_RADIUS_M
+    )
+    lats, lons = to_lat_lon(outline)
+    return np.stack([lats, lons], axis=1).tolist()
+
+
+def localize(
+    observations,
+    max_range_km=MAX_RANGE_KM,
+    min_crossing_angle=MIN_CROSSING_ANGLE,
+    cluster_km=CLUSTER_RADIUS_KM,
+):
+    """Locates smokes from bearing observations made at several camera sites.
+
+    Each observation is a dict with `site_id`, `lat`, `lon`, `azimuth` and
+    `uncertainty` (degrees, one standard deviation). Only pairs of sites close
+    enough for their cones to meet are intersected; intersections are grouped
+    per smoke, and each group is refined by weighted least squares.
+
+    Returns one estimate per smoke, most supported first, with its `lat`,
+    `lon`, 95% `ellipse`, the `positions` of the ellipse outline and the
+    `site_ids` of the observations used.
+    """
+    if len(observations) < 2:
+        return []
+
+    lats = np.array([obs["lat"] for obs in observations], dtype=float)
+    lons = np.array([obs["lon"] for obs in observations], dtype=float)
+    azimuths = np.array([obs["azimuth"] for obs in observations], dtype=float)
+    points = to_unit_vectors(lats, lons)
+    east, north = tangent_basis(points)
+    rad = np.radians(azimuths)[:, None]
+    arrays = {
+        "points": points,
+        "directions": np.sin(rad) * east + np.cos(rad) * north,
+        "azimuths": azimuths,
+        "uncertainties": np.array(
+            [max(obs["uncertainty"], 1e-3) for obs in observations], dtype=float
+        ),
+    }
+
+    # Cones of sites more than two ranges apart can never meet
+    pairs = GridIndex(lats, lons, 2 * max_range_km).neighbour_pairs()
+    if len(pairs) == 0:
+        return []
+    crossings, pairs = intersect_pairs(arrays, pairs, max_range_km, min_crossing_angle)
+    labels = cluster_points(crossings, cluster_km)
+
+    estimates = []
+    for label in np.unique(labels):
+        in_cluster = labels == label
+        members = np.unique(pairs[in_cluster])
+        guess = crossings[in_cluster].mean(axis=0)
+        guess /= np.linalg.norm(guess)
+
+        point, covariance, residuals = solve_position(arrays, members, guess)
+        outliers = np.abs(residuals) > MAX_RESIDUAL_SIGMA
+        if outliers.any() and (~outliers).sum() >= 2:
+            members = members[~outliers]
+            point, covariance, _ = solve_position(arrays, members, point)
+
+        lat, lon = to_lat_lon(point)
+        ellipse = error_ellipse(covariance)
+        estimates.append(
+            {
+                "lat": float(lat),
+                "lon": float(lon),
+                "ellipse": ellipse,
+                "positions": ellipse_positions(point, ellipse),
+                "site_ids": [observations[k]["site_id"] for k in members],
+            }
+        )
+
+    estimates.sort(key=lambda estimate: -len(estimate["site_ids"]))
+    return estimates
@@ -0,0 +1,126 @@
+"""Measures cold and warm load times of the control panel, as a browser would see them.
+
+Start the app, then run:
+
+    python measure_load.py --url http://localhost:8050
+
+The cold load fetches the page and every stylesheet, script and image it
+references with an empty cache. The warm load replays it with the cache
+filled by the cold one: resources sent with a `max-age` are not requested
+again, others are revalidated with their ETag/Last-Modified. Resources not
+served by the app itself (e.g. a CDN) are counted as external.
+"""
+
+import argparse
+import json
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+# Requested by the Dash renderer once its scripts are loaded
+DASH_ENDPOINTS = ("_dash-layout", "_dash-dependencies")
+
+
+class ResourceParser(HTMLParser):
+    """Collects the stylesheet, script and image URLs of a page."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "link" and attrs.get("rel") == "stylesheet" and attrs.get("href"):
+            self.urls.append(attrs["href"])
+        elif tag in ("script", "img") and attrs.get("src"):
+            self.urls.append(attrs["src"])
+
+
+def transferred_bytes(response) -> int:
+    """Size on the wire: the compressed length when the server compressed the body."""
+    return int(response.headers.get("Content-Length", len(response.content)))
+
+
+def max_age(response) -> int:
+    match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else 0
+
+
+def load(session, url: str, cache: dict) -> dict:
+    """Loads a page and its resources, reusing and filling `cache` (url -> response headers)."""
+    start = time.perf_counter()
+    page = session.get(url)
+    page.raise_for_status()
+    parser = ResourceParser()
+    parser.feed(page.text)
+    urls = [urljoin(url, resource) for resource in parser.urls]
+    urls += [urljoin(url, endpoint) for endpoint in DASH_ENDPOINTS]
+
+    stats = {
+        "requests": 1,
+        "bytes": transferred_bytes(page),
+        "cached": 0,
+        "revalidated": 0,
+    }
+    external = [u for u in urls if urlparse(u).netloc != urlparse(url).netloc]
+    for resource in urls:
+        headers = {}
+        entry = cache.get(resource)
+        if entry is not None:
+            if time.time() < entry["expires"]:
+                stats["cached"] += 1
+                continue
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = session.get(resource, headers=headers)
+        stats["requests"] += 1
+        stats["bytes"] += transferred_bytes(response)
+        if response.status_code == 304:
+            stats["revalidated"] += 1
+            continue
+        cache[resource] = {
+            "expires": time.time() + max_age(response),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["external"] = external
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8050", help="URL of the control panel")
+    parser.add_argument("--runs", type=int, default=5, help="Cold/warm load pairs, the median is reported")
+    args = parser.parse_args()
+
+    results = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        cache = {}
+        with requests.Session() as session:
+            session.headers["Accept-Encoding"] = "br, gzip"
+            results["cold"].append(load(session, args.url, cache))
+            results["warm"].append(load(session, args.url, cache))
+
+    summary = {}
+    for kind, runs in results.items():
+        seconds = sorted(run["seconds"] for run in runs)
+        summary[kind] = {
+            "median_ms": seconds[len(seconds) // 2] * 1000,
+            "requests": runs[-1]["requests"],
+            "bytes": runs[-1]["bytes"],
+            "cached": runs[-1]["cached"],
+            "revalidated": runs[-1]["revalidated"],
+            "external": runs[-1]["external"],
+        }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
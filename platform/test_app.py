@@ -0,0 +1,106 @@
+import gzip
+import importlib
+import re
+import sys
+from types import SimpleNamespace
+
+import brotli
+import pytest
+
+import measure_load
+
+ONE_YEAR = 365 * 24 * 3600
+BASE_URL = "http://localhost/"
+DECODERS = {"br": brotli.decompress, "gzip": gzip.decompress}
+
+
+class ClientSession:
+    """The few `requests.Session` methods measure_load uses, over the Flask test client."""
+
+    def __init__(self, client):
+        self.client = client
+        self.headers = {"Accept-Encoding": "br, gzip"}
+        self.requested = []
+
+    def get(self, url, headers=None):
+        self.requested.append(url)
+        response = self.client.get(url, headers={**self.headers, **(headers or {})})
+        decode = DECODERS.get(response.headers.get("Content-Encoding"), bytes)
+        content = decode(response.data)
+        return SimpleNamespace(
+            status_code=response.status_code,
+            headers=response.headers,
+            content=content,
+            text=content.decode(errors="replace"),
+            raise_for_status=lambda: None,
+        )
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """Test client of the app, with assets bundled as fetch_assets.py would."""
+    assets = tmp_path_factory.mktemp("assets")
+    # Large enough to be compressed
+    (assets / "bootstrap.min.css").write_text(".btn{color:#044448}\n" * 200)
+    (assets / "logo_letters_orange.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(64))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("ASSETS_DIR", str(assets))
+        sys.modules.pop("app", None)
+        app = importlib.import_module("app")
+        yield app.server.test_client()
+    sys.modules.pop("app", None)
+
+
+def resource_urls(client):
+    page = client.get("/").text
+    return re.findall(r'(?:src|href)="([^"]+)"', page)
+
+
+def test_index_has_no_external_urls(client):
+    urls = resource_urls(client)
+    assert urls
+    assert not [url for url in urls if url.startswith(("http:", "https:", "//"))]
+    assert "pyronear.org" not in client.get("/_dash-layout").text
+
+
+def test_versioned_files_are_immutable_and_compressed(client):
+    urls = resource_urls(client)
+    bundles = [url for url in urls if url.startswith("/_dash-component-suites/")]
+    assets = [url for url in urls if url.startswith("/assets/")]
+    assert bundles and assets
+    assert all("?m=" in url for url in assets)
+
+    for url in bundles + assets:
+        response = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        assert response.status_code == 200
+        assert response.cache_control.max_age == ONE_YEAR, url
+        assert response.cache_control.immutable, url
+        assert response.headers["Content-Encoding"] in ("br", "gzip"), url
+        assert DECODERS[response.headers["Content-Encoding"]](response.data)
+
+    # What browsers offer over plain HTTP
+    gzip_only = client.get(assets[0], headers={"Accept-Encoding": "gzip, deflate"})
+    assert gzip_only.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzip_only.data).startswith(b".btn")
+
+
+def test_unversioned_files_are_not_immutable(client):
+    response = client.get("/assets/bootstrap.min.css")
+    assert response.data.startswith(b".btn")
+    assert not response.cache_control.immutable
+
+
+def test_warm_reload_reuses_cached_files(client):
+    cache = {}
+    session = ClientSession(client)
+    cold = measure_load.load(session, BASE_URL, cache)
+    assert cold["external"] == []
+    assert cold["cached"] == 0
+
+    session.requested.clear()
+    warm = measure_load.load(session, BASE_URL, cache)
+    # Only the page and the layout/dependencies Dash asks for are requested again
+    assert warm["cached"] == cold["requests"] - 1 - len(measure_load.DASH_ENDPOINTS)
+    assert warm["requests"] == 1 + len(measure_load.DASH_ENDPOINTS)
+    assert not [url for url in session.requested if "/_dash-component-suites/" in url]
+    assert warm["bytes"] < cold["bytes"]
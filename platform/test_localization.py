@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+
+from localization import MAX_RANGE_KM, GridIndex, localize
+from viewshed import destination_points
+
+SMOKE = (45.0, 5.0)
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing (degrees) from the first point to the second."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlon = np.radians(lon2 - lon1)
+    y = np.sin(dlon) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def observations_of(smoke, sites, uncertainty=1.0, noise=None):
+    """Bearings from each (lat, lon) site to `smoke`, optionally perturbed by `noise` degrees."""
+    noise = np.zeros(len(sites)) if noise is None else noise
+    return [
+        {
+            "site_id": f"site{k}",
+            "lat": lat,
+            "lon": lon,
+            "azimuth": bearing(lat, lon, *smoke) + noise[k],
+            "uncertainty": uncertainty,
+        }
+        for k, (lat, lon) in enumerate(sites)
+    ]
+
+
+def sites_around(smoke, bearings_deg, distances_km):
+    lats, lons = destination_points(
+        *smoke, np.asarray(bearings_deg), np.asarray(distances_km) * 1000
+    )
+    return list(zip(lats.tolist(), lons.tolist()))
+
+
+def offset_m(estimate, point):
+    """East/north offset (metres) of `point` from an estimate, in the local plane."""
+    east = (point[1] - estimate["lon"]) * 111_195 * np.cos(np.radians(estimate["lat"]))
+    north = (point[0] - estimate["lat"]) * 111_195
+    return east, north
+
+
+def test_three_bearings_recover_the_smoke():
+    sites = sites_around(SMOKE, [200, 280, 20], [12, 9, 15])
+    estimates = localize(observations_of(SMOKE, sites))
+
+    assert len(estimates) == 1
+    assert sorted(estimates[0]["site_ids"]) == ["site0", "site1", "site2"]
+    east, north = offset_m(estimates[0], SMOKE)
+    assert np.hypot(east, north) < 25
+
+
+def test_ellipse_covers_the_smoke_95_percent_of_the_time():
+    rng = np.random.default_rng(0)
+    sites = sites_around(SMOKE, [200, 280, 20], [12, 9, 15])
+    inside = 0
+    trials = 300
+    for _ in range(trials):
+        noise = rng.normal(0, 1.0, len(sites))
+        [estimate] = localize(observations_of(SMOKE, sites, 1.0, noise))
+        ellipse = estimate["ellipse"]
+        east, north = offset_m(estimate, SMOKE)
+        theta = np.radians(ellipse["orientation_deg"])
+        along = east * np.sin(theta) + north * np.cos(theta)
+        across = east * np.cos(theta) - north * np.sin(theta)
+        inside += (along / ellipse["semi_major_m"]) ** 2 + (
+            across / ellipse["semi_minor_m"]
+        ) ** 2 <= 1
+    assert 0.9 <= inside / trials <= 0.99
+
+
+def test_distant_sites_are_never_paired():
+    far_apart = [(45.0, 5.0), (45.0, 6.5), (46.5, 5.0)]  # > 100 km apart
+    assert localize(observations_of((45.5, 5.5), far_apart)) == []
+
+
+def test_hundreds_of_sites_stay_interactive():
+    rng = np.random.default_rng(1)
+    # 20 x 20 sites, 25 km apart, each looking in a random direction
+    lats, lons = np.meshgrid(43 + np.arange(20) * 0.225, 2 + np.arange(20) * 0.32)
+    sites = list(zip(lats.ravel().tolist(), lons.ravel().tolist()))
+    observations = observations_of(SMOKE, sites, noise=rng.uniform(0, 360, len(sites)))
+
+    pairs = GridIndex(lats.ravel(), lons.ravel(), 2 * MAX_RANGE_KM).neighbour_pairs()
+    assert len(pairs) < len(sites) * (len(sites) - 1) / 2 / 4
+
+    start = time.perf_counter()
+    estimates = localize(observations)
+    assert time.perf_counter() - start < 2
+    assert all(len(estimate["site_ids"]) >= 2 for estimate in estimates)
@@ -0,0 +1,78 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from tile_cache import TileCache
+
+
+class FakeUpstream:
+    """Tile server answering every tile with `size` bytes, until it goes offline."""
+
+    def __init__(self, size=100):
+        self.size = size
+        self.online = True
+        self.requested = []
+
+    def get(self, url, timeout):
+        if not self.online:
+            raise requests.ConnectionError("unreachable")
+        self.requested.append(url)
+        return SimpleNamespace(content=bytes(self.size), raise_for_status=lambda: None)
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+def make_cache(directory, upstream, max_bytes=250):
+    cache = TileCache(str(directory), max_bytes, upstream_url="{z}/{x}/{y}")
+    cache.session = upstream
+    return cache
+
+
+def test_least_recently_used_tile_is_evicted(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    cache.get(1, 0, 0)
+    cache.get(1, 0, 1)
+    cache.get(1, 0, 0)  # Hit: now more recent than (0, 1)
+    cache.get(1, 0, 2)
+
+    assert upstream.requested == ["1/0/0", "1/0/1", "1/0/2"]
+    assert cache.total_bytes == 200
+    assert os.path.exists(cache._path(1, 0, 0))
+    assert not os.path.exists(cache._path(1, 0, 1))
+
+
+def test_lru_order_survives_a_restart(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    cache.get(1, 0, 0)
+    cache.get(1, 0, 1)
+    # Tile (0, 0) was used last, before the restart
+    os.utime(cache._path(1, 0, 1), (1000, 1000))
+    os.utime(cache._path(1, 0, 0), (2000, 2000))
+
+    restarted = make_cache(tmp_path, upstream)
+    assert restarted.total_bytes == 200
+    restarted.get(1, 0, 2)
+    assert os.path.exists(restarted._path(1, 0, 0))
+    assert not os.path.exists(restarted._path(1, 0, 1))
+
+
+def test_cached_tiles_are_served_offline(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    tile = cache.get(1, 0, 0)
+    upstream.online = False
+
+    assert cache.get(1, 0, 0) == tile
+    assert cache.get(1, 0, 1) is None
+    assert upstream.requested == ["1/0/0"]
+
+
+def test_tile_larger_than_the_cache_is_not_stored(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream, max_bytes=50)
+    assert cache.get(1, 0, 0) == bytes(100)
+    assert cache.total_bytes == 0
+    assert not os.path.exists(cache._path(1, 0, 0))
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from viewshed import (
+    EARTH_RADIUS_M,
+    REFRACTION_COEFFICIENT,
+    SAMPLE_STEP_M,
+    ElevationRaster,
+    visible_distances,
+)
+
+SITE = (45.0, 5.0)
+RES = 0.001  # Degrees per pixel, about 80 m east-west at this latitude
+
+
+def write_dem(tmp_path, elevation, nodata=-9999):
+    """Writes a .npy raster with its .json sidecar; pixel (0, 0) is at lat 45.5, lon 4.5."""
+    path = tmp_path / "dem.npy"
+    np.save(path, elevation.astype(np.float32))
+    meta = {"geotransform": [4.5, RES, 0, 45.5, 0, -RES], "nodata": nodata}
+    (tmp_path / "dem.json").write_text(json.dumps(meta))
+    return ElevationRaster(str(path))
+
+
+@pytest.fixture
+def flat():
+    return np.zeros((1000, 1000))
+
+
+def test_raster_is_memory_mapped_and_sampled_by_point(tmp_path, flat):
+    flat[500, 500] = 123
+    flat[0, 0] = -9999
+    raster = write_dem(tmp_path, flat)
+
+    assert isinstance(raster.data, np.memmap)
+    values = raster.sample(
+        np.array([45.0 - RES / 2, 45.5 - RES / 2, 50.0]),
+        np.array([5.0 + RES / 2, 4.5, 5.0]),
+    )
+    assert values[0] == 123
+    assert np.isnan(values[1])  # nodata
+    assert np.isnan(values[2])  # Outside the raster
+
+
+def test_ridge_clips_the_cone(tmp_path, flat):
+    # North-south ridge, 500 m high, about 3.9 km east of the site
+    flat[:, 550:552] = 500
+    raster = write_dem(tmp_path, flat)
+    ridge_m = 0.05 * 111_195 * np.cos(np.radians(SITE[0]))
+
+    east, north = visible_distances(
+        raster, *SITE, np.array([90.0, 0.0]), 15, mast_height=20, target_height=30
+    )
+    assert ridge_m - SAMPLE_STEP_M <= east <= ridge_m + 200
+    assert north == 15_000
+
+
+def test_earth_curvature_and_refraction_set_the_horizon(tmp_path, flat):
+    raster = write_dem(tmp_path, flat)
+    mast_height = 20
+
+    [reach] = visible_distances(
+        raster, *SITE, np.array([0.0]), 30, mast_height, target_height=0
+    )
+    # Distance to the horizon over flat ground, with the refracted earth radius
+    horizon = np.sqrt(2 * EARTH_RADIUS_M * mast_height / (1 - REFRACTION_COEFFICIENT))
+    assert abs(reach - horizon) <= SAMPLE_STEP_M
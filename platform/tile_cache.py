@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from flask import Response, abort
+
+UPSTREAM_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+MAX_CACHE_MB = 200
+FETCH_TIMEOUT = 5  # Seconds to wait for the upstream tile server
+TILE_MAX_AGE = 7 * 24 * 3600  # Seconds browsers may reuse a tile without asking again
+
+
+class TileCache:
+    """Map tiles kept on local disk, fetched upstream on a miss.
+
+    The cache holds at most `max_bytes`; when a new tile would exceed it, the
+    least recently used tiles are deleted first. The LRU order is kept in
+    memory, and in file mtimes so it survives restarts. Tiles already on disk
+    are still served when the upstream server cannot be reached.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = MAX_CACHE_MB * 1024 * 1024,
+        upstream_url: str = UPSTREAM_URL,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.upstream_url = upstream_url
+        self.session = requests.Session()
+        # OpenStreetMap rejects requests without an identifying User-Agent
+        self.session.headers["User-Agent"] = "pyronear-camera-platform tile cache"
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        tiles = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                tiles.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+        # path -> size in bytes, least recently used first
+        self._sizes = OrderedDict((path, size) for _, path, size in sorted(tiles))
+        self.total_bytes = sum(self._sizes.values())
+
+    def _path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.directory, str(z), str(x), f"{y}.png")
+
+    def get(self, z: int, x: int, y: int):
+        """Returns the PNG bytes of a tile, or None if it is neither cached nor reachable."""
+        path = self._path(z, x, y)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+            with self._lock:
+                if path in self._sizes:
+                    self._sizes.move_to_end(path)
+            return data
+        except OSError:
+            pass
+
+        try:
+            response = self.session.get(
+                self.upstream_url.format(z=z, x=x, y=y), timeout=FETCH_TIMEOUT
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        self._store(path, response.content)
+        return response.content
+
+    def _store(self, path: str, data: bytes):
+        with self._lock:
+            if len(data) > self.max_bytes:
+                return
+            self._evict(self.max_bytes - len(data))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written aside then renamed, so readers never see a partial tile
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+            self.total_bytes += len(data) - self._sizes.get(path, 0)
+            self._sizes[path] = len(data)
+            self._sizes.move_to_end(path)
+
+    def _evict(self, target_bytes: int):
+        """Deletes least recently used tiles until the cache holds at most `target_bytes`."""
+        while self.total_bytes > target_bytes and self._sizes:
+            path, size = self._sizes.popitem(last=False)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+
+
+def register_tile_route(server, cache: TileCache, route: str = "/tiles"):
+    """Serves `cache` on a Flask server as `<route>/{z}/{x}/{y}.png`; returns the tile URL template."""
+
+    @server.route(f"{route}/<int:z>/<int:x>/<int:y>.png")
+    def serve_tile(z, x, y):
+        data = cache.get(z, x, y)
+        if data is None:
+            abort(404)
+        response = Response(data, mimetype="image/png")
+        response.cache_control.public = True
+        response.cache_control.max_age = TILE_MAX_AGE
+        return response
+
+    return f"{route}/{{z}}/{{x}}/{{y}}.png"
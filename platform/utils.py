@@ -2,8 +2,45 @@ from geopy.distance import geodesic
 from geopy import Point
 import dash_leaflet as dl
 
+from viewshed import RAY_STEP_DEG, viewshed_positions
 
-def build_vision_polygon(site_lat, site_lon, azimuth, opening_angle, dist_km):
+
+def build_vision_polygon(
+    site_lat,
+    site_lon,
+    azimuth,
+    opening_angle,
+    dist_km,
+    dem_path=None,
+    mast_height=20,
+    target_height=30,
+):
+    """Builds the vision cone of a camera.
+
+    With `dem_path` (elevation raster, see `viewshed.ElevationRaster`), the cone
+    is clipped where terrain hides a smoke plume `target_height` metres high
+    from a camera `mast_height` metres above the ground.
+    """
+    if dem_path:
+        # Quantized to the ray step so a moving camera hits the cache
+        positions = viewshed_positions(
+            dem_path,
+            site_lat,
+            site_lon,
+            round(azimuth / RAY_STEP_DEG) * RAY_STEP_DEG % 360,
+            opening_angle,
+            dist_km,
+            mast_height,
+            target_height,
+        )
+        polygon = dl.Polygon(
+            id="vision_polygon",
+            color="#ff7800",
+            opacity=0.5,
+            fillOpacity=0.2,
+            positions=[list(point) for point in positions],
+        )
+        return polygon, azimuth
 
     center = [site_lat, site_lon]
 
@@ -35,3 +72,36 @@ def build_vision_polygon(site_lat, site_lon, azimuth, opening_angle, dist_km):
     )
 
     return polygon, azimuth
+
+
+def build_localization_layer(estimates):
+    """Map components (error ellipse and centre) for the smokes found by `localization.localize`."""
+    children = []
+    for k, estimate in enumerate(estimates):
+        children.append(
+            dl.Polygon(
+                id=f"smoke_ellipse_{k}",
+                color="#d7191c",
+                opacity=0.8,
+                fillOpacity=0.3,
+                positions=estimate["positions"],
+            )
+        )
+        children.append(
+            dl.CircleMarker(
+                center=[estimate["lat"], estimate["lon"]],
+                radius=4,
+                color="#d7191c",
+                children=dl.Tooltip(
+                    f"{len(estimate['site_ids'])} cameras, "
+                    f"±{estimate['ellipse']['semi_major_m']:.0f} m"
+                ),
+            )
+        )
+    return children
+
+
+def scale_to_range(percent, value_range):
+    """Maps a 0-100 slider value onto a camera {"min": ..., "max": ...} range."""
+    span = value_range["max"] - value_range["min"]
+    return int(round(value_range["min"] + percent * span / 100))
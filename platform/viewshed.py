@@ -0,0 +1,174 @@
+import json
+from functools import lru_cache
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+REFRACTION_COEFFICIENT = 0.13  # Standard atmospheric refraction, bends sight lines down
+SAMPLE_STEP_M = 30  # Distance between two elevation samples along a radial line
+RAY_STEP_DEG = 0.5  # Angle between two radial lines of the cone
+TILE_SIZE = 256  # GeoTIFF tile edge, in pixels
+TILE_CACHE_SIZE = 64  # GeoTIFF tiles kept in memory
+
+
+class ElevationRaster:
+    """Elevation raster in EPSG:4326, sampled point by point and never loaded wholesale.
+
+    Supports a `.npy` array opened as a memory map, georeferenced by a `.json`
+    sidecar holding a GDAL geotransform (`{"geotransform": [west, res_lon, 0,
+    north, 0, -res_lat], "nodata": -9999}`), or a GeoTIFF read by tiles through
+    rasterio with an LRU tile cache.
+    """
+
+    def __init__(
+        self, path: str, tile_size: int = TILE_SIZE, cache_size: int = TILE_CACHE_SIZE
+    ):
+        self.path = path
+        self.tile_size = tile_size
+        if path.endswith(".npy"):
+            self.data = np.load(path, mmap_mode="r")
+            with open(path[: -len(".npy")] + ".json", "r") as file:
+                meta = json.load(file)
+            self.geotransform = meta["geotransform"]
+            self.nodata = meta.get("nodata")
+            self.height, self.width = self.data.shape
+        else:
+            try:
+                import rasterio
+            except ImportError as e:
+                raise ImportError(
+                    "Reading GeoTIFF elevation rasters requires rasterio"
+                ) from e
+            self.data = None
+            self.dataset = rasterio.open(path)
+            self.geotransform = self.dataset.transform.to_gdal()
+            self.nodata = self.dataset.nodata
+            self.height, self.width = self.dataset.height, self.dataset.width
+            self.tiles_per_row = -(-self.width // tile_size)
+            self._tile = lru_cache(maxsize=cache_size)(self._read_tile)
+
+    def _read_tile(self, tile_row: int, tile_col: int):
+        from rasterio.windows import Window
+
+        size = self.tile_size
+        window = Window(tile_col * size, tile_row * size, size, size)
+        # boundless pads tiles at the raster edges so they all have the same shape
+        tile = self.dataset.read(1, window=window, boundless=True, fill_value=np.nan)
+        return tile.astype(np.float32)
+
+    def sample(self, lats, lons):
+        """Returns the elevations (metres) at the given points, NaN outside the raster."""
+        west, res_lon, _, north, _, res_lat = self.geotransform
+        rows = np.floor((np.asarray(lats) - north) / res_lat).astype(np.int64)
+        cols = np.floor((np.asarray(lons) - west) / res_lon).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+
+        values = np.full(rows.shape, np.nan, dtype=np.float32)
+        r, c = rows[inside], cols[inside]
+        if self.data is not None:
+            # Fancy indexing on the memory map only pages in the touched rows
+            values[inside] = self.data[r, c]
+        else:
+            tile_ids = (r // self.tile_size) * self.tiles_per_row + c // self.tile_size
+            inside_values = np.empty(r.shape, dtype=np.float32)
+            for tile_id in np.unique(tile_ids):
+                in_tile = tile_ids == tile_id
+                tile_row, tile_col = divmod(int(tile_id), self.tiles_per_row)
+                tile = self._tile(tile_row, tile_col)
+                inside_values[in_tile] = tile[
+                    r[in_tile] - tile_row * self.tile_size,
+                    c[in_tile] - tile_col * self.tile_size,
+                ]
+            values[inside] = inside_values
+
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values
+
+
+@lru_cache(maxsize=8)
+def get_raster(path: str) -> ElevationRaster:
+    """Opens an elevation raster once per path."""
+    return ElevationRaster(path)
+
+
+def destination_points(lat, lon, bearings_deg, distances_m):
+    """Vectorized spherical destination; bearings and distances are broadcast together."""
+    phi1 = np.radians(lat)
+    lambda1 = np.radians(lon)
+    theta = np.radians(bearings_deg)
+    delta = np.asarray(distances_m) / EARTH_RADIUS_M
+
+    phi2 = np.arcsin(
+        np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta)
+    )
+    lambda2 = lambda1 + np.arctan2(
+        np.sin(theta) * np.sin(delta) * np.cos(phi1),
+        np.cos(delta) - np.sin(phi1) * np.sin(phi2),
+    )
+    return np.degrees(phi2), (np.degrees(lambda2) + 540) % 360 - 180
+
+
+def visible_distances(
+    raster, site_lat, site_lon, bearings, dist_km, mast_height, target_height
+):
+    """Distance (metres) along each bearing up to which a target is in line of sight.
+
+    A point is visible when a target `target_height` metres above the ground
+    there is seen above every terrain point between it and the camera. Each
+    radial line is cut at its first hidden point, past the nearest ridge.
+    """
+    distances = np.arange(
+        SAMPLE_STEP_M, dist_km * 1000 + SAMPLE_STEP_M / 2, SAMPLE_STEP_M
+    )
+    # One row per bearing, one column per distance
+    lats, lons = destination_points(
+        site_lat, site_lon, bearings[:, None], distances[None, :]
+    )
+    ground = raster.sample(lats.ravel(), lons.ravel()).reshape(lats.shape)
+
+    site_ground = raster.sample(np.array([site_lat]), np.array([site_lon]))[0]
+    observer = (0.0 if np.isnan(site_ground) else site_ground) + mast_height
+
+    # Earth curvature, reduced by refraction, lowers distant points
+    drop = distances**2 / (2 * EARTH_RADIUS_M) * (1 - REFRACTION_COEFFICIENT)
+    terrain_slope = (ground - drop - observer) / distances
+    target_slope = (ground + target_height - drop - observer) / distances
+    # Points outside the raster neither hide anything nor get hidden
+    terrain_slope = np.where(np.isnan(terrain_slope), -np.inf, terrain_slope)
+    target_slope = np.where(np.isnan(target_slope), np.inf, target_slope)
+
+    # Steepest terrain slope strictly before each sample
+    horizon = np.maximum.accumulate(terrain_slope, axis=1)
+    horizon = np.concatenate(
+        [np.full((len(bearings), 1), -np.inf), horizon[:, :-1]], axis=1
+    )
+    hidden = target_slope < horizon
+
+    first_hidden = np.where(hidden.any(axis=1), hidden.argmax(axis=1), len(distances))
+    # Last visible sample, or the camera itself when the first sample is already hidden
+    return np.where(first_hidden > 0, distances[np.maximum(first_hidden - 1, 0)], 0.0)
+
+
+@lru_cache(maxsize=256)
+def viewshed_positions(
+    dem_path,
+    site_lat,
+    site_lon,
+    azimuth,
+    opening_angle,
+    dist_km,
+    mast_height,
+    target_height,
+):
+    """Polygon positions of the cone clipped by terrain, cached per site, azimuth and fov."""
+    raster = get_raster(dem_path)
+    n_rays = int(round(opening_angle / RAY_STEP_DEG)) + 1
+    offsets = np.linspace(-opening_angle / 2, opening_angle / 2, n_rays)
+    bearings = (azimuth + offsets) % 360
+    reach = visible_distances(
+        raster, site_lat, site_lon, bearings, dist_km, mast_height, target_height
+    )
+
+    lats, lons = destination_points(site_lat, site_lon, bearings, reach)
+    return ((site_lat, site_lon), *zip(lats.tolist(), lons.tolist()))